@@ -10,21 +10,27 @@ All rights reserved. This file is part of the FFmpeg-API project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import os
+import asyncio
 import logging
-import docker
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from routers.router import router
-from config import AVAILBLE_ENCODERS
-from ffmpeg_methods.get_encoders import get_encoders
+from routers.profiling import profile_requests
+from environment.get_role import get_role
+from environment.get_profiling_mode import get_profiling_mode
+from ffmpeg_methods.discover_encoders import discover_encoders
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("Getting the available encoders...")
-    AVAILBLE_ENCODERS.extend(await get_encoders())
+    # Discover the encoders in the background so that requests are served immediately.
+    # API nodes hand encodes to workers, which report their own encoders.
+    discovery = None
+    if get_role() != "api":
+        discovery = asyncio.create_task(discover_encoders())
     yield
+    if discovery:
+        discovery.cancel()
 
 
 # Initialize new FastAPI application
@@ -33,11 +39,12 @@ app = FastAPI(lifespan=lifespan)
 # Use the included router
 app.include_router(router)
 
+# Profile requests only if enabled, so that there is no overhead otherwise
+if get_profiling_mode() != "off":
+    app.middleware("http")(profile_requests)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
-
-# Get the Docker client
-client = docker.from_env()
@@ -0,0 +1,91 @@
+"""
+throughput.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Benchmark the aggregate encode throughput of concurrent FFmpeg jobs with and without thread budgets
+
+Run from the backend directory with:
+    python -m benchmarks.throughput --jobs 4 --frames 600
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import docker
+from config import THROUGHPUT_PRESET
+from docker_methods.generate_parameters import generate_parameters
+from docker_methods.run_container import run_container
+
+
+def build_benchmark_command(frames: int, resolution: str, threads: int = None):
+    """
+    Build an FFmpeg command encoding a synthetic test source with libx264, discarding the output.
+
+    Both modes use the throughput preset, so that only the thread budget differs between them.
+    """
+    command = []
+    if threads:
+        command += ["-filter_threads", str(threads)]
+    command += ["-f", "lavfi", "-i", f"testsrc2=size={resolution}:rate=30"]
+    command += ["-frames:v", str(frames), "-c:v", "libx264"]
+    command += ["-preset", THROUGHPUT_PRESET]
+    if threads:
+        command += ["-threads", str(threads)]
+    command += ["-f", "null", "-"]
+    return command
+
+
+async def run_jobs(jobs: int, frames: int, resolution: str, budgeted: bool):
+    """
+    Run the jobs concurrently and return the aggregate frames per second
+    """
+    threads = None
+    if budgeted:
+        cores = docker.from_env().info()["NCPU"]
+        threads = max(cores // jobs, 1)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            run_container(
+                generate_parameters(
+                    build_benchmark_command(frames, resolution, threads),
+                    threads=threads,
+                )
+            )
+            for _ in range(jobs)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    return jobs * frames / elapsed, threads
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Compare aggregate encode throughput with and without thread budgets"
+    )
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--resolution", default="1280x720")
+    args = parser.parse_args()
+
+    # generate_parameters() mounts the storage directory, which the benchmark does not use
+    os.environ.setdefault("STORAGE_PATH", tempfile.gettempdir())
+
+    print(f"{'jobs':>4} {'mode':>10} {'threads':>7} {'aggregate fps':>14}")
+    for jobs in args.jobs:
+        for budgeted in [False, True]:
+            fps, threads = await run_jobs(jobs, args.frames, args.resolution, budgeted)
+            mode = "budgeted" if budgeted else "unbudgeted"
+            print(f"{jobs:>4} {mode:>10} {threads or 'auto':>7} {fps:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,5 +10,90 @@ All rights reserved. This file is part of the FFmpeg-API project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
+import os
+import socket
+
 # The list of available encoders
 AVAILBLE_ENCODERS = []
+
+# The label applied to every FFmpeg container started by the API
+JOB_LABEL = "ffmpeg-api.job"
+
+# The value of the job label, identifying the process which started the container
+JOB_OWNER = f"{socket.gethostname()}-{os.getpid()}"
+
+# The number of FFmpeg jobs in this process which hold a thread budget
+RESERVED_JOBS = {"count": 0}
+
+# The preset used for software encoders when running in throughput mode
+THROUGHPUT_PRESET = "veryfast"
+
+# The software encoders which accept the "-preset" option
+PRESET_ENCODERS = ["libx264", "libx265"]
+
+# The directory in which uploaded media is stored for reuse across requests
+MEDIA_DIRECTORY = "/storage/media"
+
+# The encoders used to re-encode media into a codec reported by ffprobe
+CODEC_ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "vp8": "libvpx",
+    "vp9": "libvpx-vp9",
+    "av1": "libaom-av1",
+    "mpeg4": "mpeg4",
+    "aac": "aac",
+    "mp3": "libmp3lame",
+    "opus": "libopus",
+    "vorbis": "libvorbis",
+    "flac": "flac",
+    "ac3": "ac3",
+}
+
+# The libx264 profiles matching the H.264 profiles reported by ffprobe
+X264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+
+# The directory in which the keyframe indexes of stored media are kept
+KEYFRAME_INDEX_DIRECTORY = "/storage/media/keyframes"
+
+# The SQLite database through which API nodes hand jobs to workers. It must stay on storage
+# local to one host, since SQLite locking is unreliable over a network filesystem
+QUEUE_PATH = "/storage/queue.sqlite3"
+
+# How long a worker holds a job without a heartbeat before it is leased to another worker
+LEASE_SECONDS = 60
+
+# How often a worker renews its lease and reports that it is alive
+HEARTBEAT_SECONDS = 15
+
+# How often API nodes and idle workers poll the queue
+POLL_SECONDS = 1
+
+# How many times a job is leased before it is failed
+MAX_ATTEMPTS = 3
+
+# How long an API node waits for a worker to lease a job before failing it with a 503
+QUEUE_TIMEOUT_SECONDS = 300
+
+# How long an API node waits for a job to finish before failing it with a 504
+JOB_TIMEOUT_SECONDS = 3600
+
+# The progress of the background encoder discovery started at startup
+ENCODER_DISCOVERY = {"ready": False, "error": None}
+
+# The directory in which request profiles are stored
+PROFILE_DIRECTORY = "/storage/profiles"
+
+# The number of request profiles kept, after which the oldest are deleted
+PROFILE_RETENTION = 100
+
+# The number of files probed at once by the batch metadata endpoint
+PROBE_WORKERS = os.cpu_count() or 1
@@ -0,0 +1,33 @@
+"""
+execute_job.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Run a job of any kind on this host
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from docker_methods.run_clip import run_clip
+from docker_methods.run_concat import run_concat
+from docker_methods.run_pipeline import run_pipeline
+from docker_methods.run_transcode import run_transcode
+from ffmpeg_methods.get_audio_analysis import get_audio_analysis
+
+# The functions which run each kind of job
+JOB_RUNNERS = {
+    "transcode": run_transcode,
+    "pipeline": run_pipeline,
+    "concat": run_concat,
+    "clip": run_clip,
+    "audio-analysis": get_audio_analysis,
+}
+
+
+async def execute_job(kind: str, arguments: dict):
+    """
+    Run a job and return its result, which must be JSON serializable
+    """
+    return await JOB_RUNNERS[kind](**arguments)
@@ -10,24 +10,28 @@ All rights reserved. This file is part of the FFmpeg-API project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import docker
 from docker.types import Mount
+from config import JOB_LABEL, JOB_OWNER
 from environment.get_hardware_encoder import get_hardware_encoder
 from environment.get_storage_directory import get_storage_directory
 
 
-def generate_parameters(command: str):
+def generate_parameters(command: str, threads: int = None):
     params = {
         "image": "linuxserver/ffmpeg",
         "command": command,
         "mounts": [
             Mount(target="/storage", source=get_storage_directory(), type="bind")
         ],
-        "auto_remove": True,
         "detach": True,
         "tty": True,
+        "labels": {JOB_LABEL: JOB_OWNER},
     }
 
+    # Limit the container to the CPU time of its thread budget
+    if threads:
+        params["nano_cpus"] = threads * 1_000_000_000
+
     hardware_encoder = get_hardware_encoder()
     if not hardware_encoder:
         print("No hardware encoder specified")
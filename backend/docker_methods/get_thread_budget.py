@@ -0,0 +1,57 @@
+"""
+get_thread_budget.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the number of threads a new FFmpeg job may use on the Docker host
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+import docker
+from contextlib import asynccontextmanager
+from config import JOB_LABEL, JOB_OWNER, RESERVED_JOBS
+from environment.get_throughput_mode import get_throughput_mode
+
+
+def get_thread_budget(jobs: int = 1):
+    """
+    Split the cores of the Docker host evenly between the running FFmpeg jobs and the new
+    ones, counting jobs whose budget is reserved as running
+    """
+    client = docker.from_env()
+    cores = client.info()["NCPU"]
+
+    # Count the FFmpeg containers started by other processes on the host. Jobs started by
+    # this process are counted by their reservations instead, which also covers the jobs
+    # whose containers have not been started yet
+    running_jobs = [
+        container
+        for container in client.containers.list(filters={"label": JOB_LABEL})
+        if container.labels.get(JOB_LABEL) != JOB_OWNER
+    ]
+
+    return max(cores // max(len(running_jobs) + RESERVED_JOBS["count"] + jobs, 1), 1)
+
+
+@asynccontextmanager
+async def reserve_thread_budget(jobs: int = 1):
+    """
+    Reserve the thread budget of new jobs until they finish, so that jobs started at the
+    same time do not each get every core. Outside of throughput mode the budget is None.
+    """
+    if not get_throughput_mode():
+        yield None
+        return
+
+    # Reserve the jobs before querying the Docker host, which is done in a thread so as
+    # not to block the event loop, so that jobs started meanwhile count them
+    RESERVED_JOBS["count"] += jobs
+    try:
+        threads = await asyncio.to_thread(get_thread_budget, 0)
+        yield threads
+    finally:
+        RESERVED_JOBS["count"] -= jobs
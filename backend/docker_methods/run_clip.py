@@ -0,0 +1,132 @@
+"""
+run_clip.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Cut an interval from a file in FFmpeg containers
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import logging
+from docker_methods.generate_parameters import generate_parameters
+from docker_methods.run_container import run_container
+from docker_methods.run_containers import run_containers
+from docker_methods.get_thread_budget import reserve_thread_budget
+from ffmpeg_methods.build_clip_command import build_clip_command
+from ffmpeg_methods.build_concat_command import build_concat_command
+from ffmpeg_methods.build_conform_command import build_conform_command
+from ffmpeg_methods.get_keyframes import get_keyframes
+from ffmpeg_methods.get_stream_parameters import get_stream_parameters
+
+logger = logging.getLogger(__name__)
+
+
+async def run_clip(
+    input_filepath: str,
+    output_filepath: str,
+    start: float,
+    end: float,
+    accurate: bool = False,
+):
+    """
+    Cut the interval between start and end, in seconds, from a file.
+
+    By default the streams are copied from the keyframe at or before start. If accurate
+    is set, only the partial GOPs at either end of the clip are re-encoded.
+    """
+    if not accurate:
+        # Copy the streams from the keyframe at or before start
+        ffmpeg_command = await build_clip_command(
+            input_filepath=input_filepath,
+            output_filepath=output_filepath,
+            start=start,
+            end=end,
+        )
+        try:
+            response = await run_container(generate_parameters(ffmpeg_command))
+        except BaseException:
+            # Do not leave a partial output in the storage directory
+            if os.path.exists(output_filepath):
+                os.remove(output_filepath)
+            raise
+        for line in response:
+            logger.info(line)
+        return
+
+    # Copy the whole GOPs between the first and last keyframes in the interval,
+    # and re-encode the partial GOPs before and after them
+    keyframes = await get_keyframes(input_filepath, start, end)
+    target = await get_stream_parameters(input_filepath)
+    if keyframes:
+        segments = [
+            (start, keyframes[0], False),
+            (keyframes[0], keyframes[-1], True),
+            (keyframes[-1], end, False),
+        ]
+    else:
+        segments = [(start, end, False)]
+    segments = [segment for segment in segments if segment[1] > segment[0]]
+
+    # Keep the segments next to the output
+    output_base, extension = os.path.splitext(output_filepath)
+    list_filepath = f"{output_base}-concat.txt"
+    temporary_filepaths = [list_filepath]
+    try:
+        # In throughput mode, split this host's share of the cores between the re-encodes
+        reencodes = len([segment for segment in segments if not segment[2]])
+        async with reserve_thread_budget(reencodes) as threads:
+            segment_parameters = []
+            segment_filepaths = []
+            for index, (segment_start, segment_end, copy) in enumerate(segments):
+                segment_filepath = f"{output_base}-{index}-segment{extension}"
+                temporary_filepaths.append(segment_filepath)
+                segment_filepaths.append(segment_filepath)
+                if copy:
+                    ffmpeg_command = await build_clip_command(
+                        input_filepath=input_filepath,
+                        output_filepath=segment_filepath,
+                        start=segment_start,
+                        end=segment_end,
+                        end_at_keyframe=True,
+                    )
+                    segment_parameters.append(generate_parameters(ffmpeg_command))
+                else:
+                    ffmpeg_command = await build_conform_command(
+                        input_filepath=input_filepath,
+                        output_filepath=segment_filepath,
+                        target=target,
+                        start=segment_start,
+                        duration=segment_end - segment_start,
+                        threads=threads,
+                    )
+                    segment_parameters.append(
+                        generate_parameters(ffmpeg_command, threads=threads)
+                    )
+
+            # Wait for every segment, even if one fails, before the segments are removed
+            for response in await run_containers(segment_parameters):
+                for line in response:
+                    logger.info(line)
+
+        # Join the segments without re-encoding
+        ffmpeg_command = await build_concat_command(
+            input_filepaths=segment_filepaths,
+            list_filepath=list_filepath,
+            output_filepath=output_filepath,
+        )
+        response = await run_container(generate_parameters(ffmpeg_command))
+        for line in response:
+            logger.info(line)
+    except BaseException:
+        # Do not leave a partial output in the storage directory
+        if os.path.exists(output_filepath):
+            os.remove(output_filepath)
+        raise
+    finally:
+        for filepath in temporary_filepaths:
+            if os.path.exists(filepath):
+                os.remove(filepath)
@@ -0,0 +1,99 @@
+"""
+run_concat.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Conform and join files in FFmpeg containers
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+import logging
+from exceptions import ArgumentError
+from docker_methods.generate_parameters import generate_parameters
+from docker_methods.run_container import run_container
+from docker_methods.run_containers import run_containers
+from docker_methods.get_thread_budget import reserve_thread_budget
+from ffmpeg_methods.build_concat_command import build_concat_command
+from ffmpeg_methods.build_conform_command import build_conform_command
+from ffmpeg_methods.get_stream_parameters import (
+    get_stream_parameters,
+    get_common_parameters,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def run_concat(input_filepaths: list, output_filepath: str):
+    """
+    Join the files, in order, re-encoding only those which do not match the others
+    """
+    # Keep the intermediate files next to the output
+    output_base, extension = os.path.splitext(output_filepath)
+    list_filepath = f"{output_base}-concat.txt"
+    temporary_filepaths = [list_filepath]
+
+    # Probe every file and find the stream parameters shared by most of them
+    parameters = await asyncio.gather(
+        *[get_stream_parameters(filepath) for filepath in input_filepaths]
+    )
+    target = get_common_parameters(parameters)
+
+    # A stream which a file lacks cannot be conformed, so every file needs the same streams
+    target_streams = " and ".join(sorted(target)) or "no"
+    for index in range(len(parameters)):
+        if parameters[index].keys() != target.keys():
+            streams = " and ".join(sorted(parameters[index])) or "no"
+            raise ArgumentError(
+                f"File {index + 1} has {streams} streams, but most of the files "
+                f"have {target_streams} streams. Every file needs the same streams."
+            )
+
+    # Re-encode only the files which do not match the common parameters
+    mismatched = [
+        index for index in range(len(parameters)) if parameters[index] != target
+    ]
+    input_filepaths = list(input_filepaths)
+    try:
+        # In throughput mode, split this host's share of the cores between the re-encodes
+        async with reserve_thread_budget(len(mismatched)) as threads:
+            conform_parameters = []
+            for index in mismatched:
+                conformed_filepath = f"{output_base}-{index}-conformed{extension}"
+                temporary_filepaths.append(conformed_filepath)
+                ffmpeg_command = await build_conform_command(
+                    input_filepath=input_filepaths[index],
+                    output_filepath=conformed_filepath,
+                    target=target,
+                    threads=threads,
+                )
+                conform_parameters.append(
+                    generate_parameters(ffmpeg_command, threads=threads)
+                )
+                input_filepaths[index] = conformed_filepath
+            for response in await run_containers(conform_parameters):
+                for line in response:
+                    logger.info(line)
+
+        # Join the files without re-encoding
+        ffmpeg_command = await build_concat_command(
+            input_filepaths=input_filepaths,
+            list_filepath=list_filepath,
+            output_filepath=output_filepath,
+        )
+        response = await run_container(generate_parameters(ffmpeg_command))
+        for line in response:
+            logger.info(line)
+    except BaseException:
+        # Do not leave a partial output in the storage directory
+        if os.path.exists(output_filepath):
+            os.remove(output_filepath)
+        raise
+    finally:
+        for filepath in temporary_filepaths:
+            if os.path.exists(filepath):
+                os.remove(filepath)
@@ -10,12 +10,17 @@ All rights reserved. This file is part of the FFmpeg-API project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import os
+import asyncio
 import docker
-from docker.types import Mount
+from exceptions import FFmpegError
 
 
 async def run_container(params):
+    # Wait on the container from a worker thread so that concurrent jobs do not block the event loop
+    return await asyncio.to_thread(run_container_blocking, params)
+
+
+def run_container_blocking(params):
     # Get the Docker socket
     client = docker.from_env()
 
@@ -24,13 +29,22 @@ async def run_container(params):
 
     response = []
     line_buffer = ""
-    for byte_chunk in container.logs(stream=True, follow=True):
-        # Decode the byte chunk to string
-        decoded_chunk = byte_chunk.decode("utf-8", errors="ignore")
-        line_buffer += decoded_chunk
-
-        # Check if there are newline characters indicating the end of a line
-        while "\n" in line_buffer:
-            line, line_buffer = line_buffer.split("\n", 1)
-            response.append(line)
+    try:
+        for byte_chunk in container.logs(stream=True, follow=True):
+            # Decode the byte chunk to string
+            decoded_chunk = byte_chunk.decode("utf-8", errors="ignore")
+            line_buffer += decoded_chunk
+
+            # Check if there are newline characters indicating the end of a line
+            while "\n" in line_buffer:
+                line, line_buffer = line_buffer.split("\n", 1)
+                response.append(line)
+
+        # Read the exit status before removing the container
+        exit_status = container.wait()["StatusCode"]
+    finally:
+        container.remove(force=True)
+
+    if exit_status != 0:
+        raise FFmpegError(exit_status, response)
     return response
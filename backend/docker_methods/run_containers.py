@@ -0,0 +1,30 @@
+"""
+run_containers.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Run FFmpeg containers concurrently and wait for every one of them to finish
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+from docker_methods.run_container import run_container
+
+
+async def run_containers(parameters: list):
+    """
+    Run a container for each set of parameters and return their responses in order.
+
+    If a container fails, the others are still waited for before its error is raised, so
+    that the caller does not clean up files which are still being written.
+    """
+    responses = await asyncio.gather(
+        *[run_container(params) for params in parameters], return_exceptions=True
+    )
+    for response in responses:
+        if isinstance(response, BaseException):
+            raise response
+    return responses
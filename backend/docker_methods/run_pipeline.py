@@ -0,0 +1,64 @@
+"""
+run_pipeline.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Compile and run the FFmpeg container for a pipeline
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import logging
+from exceptions import ArgumentError
+from models import Pipeline
+from docker_methods.generate_parameters import generate_parameters
+from docker_methods.run_container import run_container
+from docker_methods.get_thread_budget import reserve_thread_budget
+from ffmpeg_methods.build_pipeline_command import build_pipeline_command
+
+logger = logging.getLogger(__name__)
+
+
+async def run_pipeline(input_filepaths: list, output_filepaths: list, pipeline: dict):
+    """
+    Run every step of a pipeline in one FFmpeg container on this host
+    """
+    try:
+        # In throughput mode, limit the job to its share of the host's cores
+        async with reserve_thread_budget() as threads:
+            # Compile the pipeline into one FFmpeg command
+            ffmpeg_command = await build_pipeline_command(
+                input_filepaths=input_filepaths,
+                output_filepaths=output_filepaths,
+                pipeline=Pipeline.model_validate(pipeline),
+                threads=threads,
+            )
+
+            # Generate the parameters for the FFmpeg container
+            params = generate_parameters(ffmpeg_command, threads=threads)
+
+            # Run the FFmpeg container
+            response = await run_container(params)
+            for line in response:
+                logger.info(line)
+
+        # The outputs are stored as media, so every one of them must have been written.
+        # FFmpeg succeeds without writing a thumbnail whose time is past the end
+        for index, output in enumerate(pipeline["outputs"]):
+            if os.path.exists(output_filepaths[index]):
+                continue
+            if output["type"] == "thumbnail":
+                raise ArgumentError(
+                    f"Output {index + 1} has no frame at {output['time']} seconds. "
+                    "The thumbnail time must be within the trimmed media."
+                )
+            raise ArgumentError(f"FFmpeg wrote nothing for output {index + 1}")
+    except BaseException:
+        # Do not leave partial outputs in the media directory
+        for output_filepath in output_filepaths:
+            if os.path.exists(output_filepath):
+                os.remove(output_filepath)
+        raise
@@ -0,0 +1,37 @@
+"""
+run_transcode.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Build and run the FFmpeg container for a transcode or merge
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import logging
+from docker_methods.generate_parameters import generate_parameters
+from docker_methods.run_container import run_container
+from docker_methods.get_thread_budget import reserve_thread_budget
+from ffmpeg_methods.build_command import build_command
+
+logger = logging.getLogger(__name__)
+
+
+async def run_transcode(**arguments):
+    """
+    Run build_command() with the supplied arguments in an FFmpeg container on this host
+    """
+    # In throughput mode, limit the job to its share of the host's cores
+    async with reserve_thread_budget() as threads:
+        # Assemble the FFmpeg command
+        ffmpeg_command = await build_command(**arguments, threads=threads)
+
+        # Generate the parameters for the FFmpeg container
+        params = generate_parameters(ffmpeg_command, threads=threads)
+
+        # Run the FFmpeg container
+        response = await run_container(params)
+        for line in response:
+            logger.info(line)
@@ -0,0 +1,28 @@
+"""
+get_profiling_mode.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the request profiling mode from the "PROFILING" environment variable
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+
+# off: never profile
+# on-demand: profile requests with a true "X-Profile" header or "profile" query parameter,
+#   such as "X-Profile: 1" or "?profile=true"
+# always: profile every request
+PROFILING_MODES = ["off", "on-demand", "always"]
+
+
+def get_profiling_mode():
+    profiling_mode = os.environ.get("PROFILING", "off")
+    if profiling_mode not in PROFILING_MODES:
+        raise ValueError(
+            f"{profiling_mode} is not a valid profiling mode. The valid modes are {PROFILING_MODES}"
+        )
+    return profiling_mode
@@ -0,0 +1,25 @@
+"""
+get_role.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the role of this node from the "ROLE" environment variable
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+
+# standalone: serve requests and encode locally
+# api: serve requests and enqueue encodes for workers
+# worker: pull encodes from the queue
+ROLES = ["standalone", "api", "worker"]
+
+
+def get_role():
+    role = os.environ.get("ROLE", "standalone")
+    if role not in ROLES:
+        raise ValueError(f"{role} is not a valid role. The valid roles are {ROLES}")
+    return role
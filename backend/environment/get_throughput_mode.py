@@ -0,0 +1,20 @@
+"""
+get_throughput_mode.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get whether throughput mode is enabled from the "THROUGHPUT_MODE" environment variable
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+
+
+def get_throughput_mode():
+    throughput_mode = os.environ.get("THROUGHPUT_MODE")
+    if throughput_mode is None:
+        return False
+    return throughput_mode.lower() in ["1", "true", "yes", "on"]
@@ -29,3 +29,37 @@ class InvalidEncoderError(Exception):
         message = f"The requested encoder, {encoder}, is not available. Choose from nvenc (Nvidia), vaapi (AMD), or qsv (Intel)"
         self.message = message
         super().__init__(message)
+
+
+class NotAnAudioError(Exception):
+    def __init__(self, filepath):
+        message = f"The file {filepath} does not contain any audio"
+        self.message = message
+        super().__init__(message)
+
+
+class MediaNotFoundError(Exception):
+    def __init__(self, media_id):
+        message = f"No stored media has the id {media_id}"
+        self.message = message
+        super().__init__(message)
+
+
+class JobFailedError(Exception):
+    def __init__(self, status_code, detail):
+        message = f"The job failed with status {status_code}: {detail}"
+        self.status_code = status_code
+        self.detail = detail
+        self.message = message
+        super().__init__(message)
+
+
+class FFmpegError(Exception):
+    def __init__(self, exit_status, log):
+        message = f"FFmpeg exited with status {exit_status}"
+        if log:
+            message += f": {log[-1]}"
+        self.exit_status = exit_status
+        self.log = log
+        self.message = message
+        super().__init__(message)
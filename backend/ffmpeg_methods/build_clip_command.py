@@ -0,0 +1,89 @@
+"""
+build_clip_command.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Build an FFmpeg command which cuts a clip from a file without re-encoding
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from exceptions import ArgumentError
+
+
+async def build_clip_command(
+    input_filepath: str,
+    output_filepath: str,
+    start: float,
+    end: float,
+    end_at_keyframe: bool = False,
+):
+    """
+    Build an FFmpeg command to copy the streams between start and end into a new file.
+
+    The input is seeked before it is opened, so the clip begins at the keyframe at or
+    before start. If end_at_keyframe is set, end is known to be a keyframe, and the
+    frames from it onwards, which the muxer would pass through along with the reordered
+    frames before it, are dropped.
+    """
+    await validate_arguments(
+        input_filepath=input_filepath,
+        output_filepath=output_filepath,
+        start=start,
+        end=end,
+    )
+
+    ffmpeg_command = [
+        "-ss",
+        str(start),
+        "-i",
+        input_filepath,
+        "-t",
+        str(end - start),
+        "-map",
+        "0:v:0?",
+        "-map",
+        "0:a:0?",
+        "-c",
+        "copy",
+    ]
+    if end_at_keyframe:
+        ffmpeg_command.append("-bsf:v")
+        ffmpeg_command.append(f"noise=drop=gte(pts*tb\\,{end - start})")
+    ffmpeg_command += [
+        "-avoid_negative_ts",
+        "make_zero",
+        output_filepath,
+    ]
+    return ffmpeg_command
+
+
+async def validate_arguments(
+    input_filepath: str,
+    output_filepath: str,
+    start: float,
+    end: float,
+):
+    """
+    Validate the arguments supplied to build_clip_command()
+    """
+    # Validate that the input file exists and is not a directory
+    if not os.path.exists(input_filepath):
+        raise FileNotFoundError
+    if not os.path.isfile(input_filepath):
+        raise IsADirectoryError
+
+    # Validate that output_filepath does not represent an existing file or directory
+    if os.path.exists(output_filepath):
+        raise FileExistsError(
+            f"{output_filepath} already exists and cannot be overwritten"
+        )
+
+    # Validate the interval
+    if start < 0:
+        raise ArgumentError(f"Start must be >= 0, got {start}")
+    if end <= start:
+        raise ArgumentError(f"End must be greater than start, got {start} to {end}")
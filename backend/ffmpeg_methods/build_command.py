@@ -12,7 +12,12 @@ the MIT License. See the LICENSE file for more details.
 
 import os
 from fastapi import HTTPException
-from config import AVAILBLE_ENCODERS
+from config import (
+    AVAILBLE_ENCODERS,
+    ENCODER_DISCOVERY,
+    PRESET_ENCODERS,
+    THROUGHPUT_PRESET,
+)
 from exceptions import ArgumentError
 from environment.get_hardware_encoder import get_hardware_encoder
 from ffmpeg_methods.get_media_type import get_media_type
@@ -28,9 +33,13 @@ async def build_command(
     horizontal_resolution: int = None,
     vertical_resolution: int = None,
     input_filepath2: str = None,
+    threads: int = None,
 ):
     """
-    Build an FFmpeg command to be used to transcode the supplied media
+    Build an FFmpeg command to be used to transcode the supplied media.
+
+    If a thread budget is supplied, the decoders, filters, and encoders are limited to it
+    and software encoders are switched to the throughput preset.
     """
     await validate_arguments(
         input_filepath1=input_filepath1,
@@ -42,19 +51,32 @@ async def build_command(
         audio_bitrate=audio_bitrate,
         horizontal_resolution=horizontal_resolution,
         vertical_resolution=vertical_resolution,
+        threads=threads,
     )
 
     ffmpeg_command = []
+
+    # Limit the filter graph to the thread budget
+    if threads:
+        ffmpeg_command.append("-filter_threads")
+        ffmpeg_command.append(str(threads))
+
     if get_hardware_encoder() == "vaapi":
         ffmpeg_command.append("-vaapi_device")
         ffmpeg_command.append("/dev/dri/renderD128")
 
     # Add the main filepath
+    if threads:
+        ffmpeg_command.append("-threads")
+        ffmpeg_command.append(str(threads))
     ffmpeg_command.append("-i")
     ffmpeg_command.append(input_filepath1)
 
     # Add the secondary filepath (for merging multimedia)
     if input_filepath2:
+        if threads:
+            ffmpeg_command.append("-threads")
+            ffmpeg_command.append(str(threads))
         ffmpeg_command.append("-i")
         ffmpeg_command.append(input_filepath2)
 
@@ -96,6 +118,14 @@ async def build_command(
     else:
         ffmpeg_command.append("copy")
 
+    # Limit the encoders to the thread budget
+    if threads:
+        ffmpeg_command.append("-threads")
+        ffmpeg_command.append(str(threads))
+        if video_codec in PRESET_ENCODERS:
+            ffmpeg_command.append("-preset")
+            ffmpeg_command.append(THROUGHPUT_PRESET)
+
     # Add the output filepath
     ffmpeg_command.append(output_filepath)
     return ffmpeg_command
@@ -111,6 +141,7 @@ async def validate_arguments(
     audio_bitrate: str,
     horizontal_resolution: int,
     vertical_resolution: int,
+    threads: int = None,
 ):
     """
     Validate the arguments supplied to build_command()
@@ -159,6 +190,13 @@ async def validate_arguments(
                         detail=f"Parameters 'audio_codec' and 'audio_birate' may not be used for a video file",
                     )
 
+    # The requested codecs cannot be verified until the encoders have been discovered
+    if (video_codec or audio_codec) and not ENCODER_DISCOVERY["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail="The available encoders are still being discovered. Try again shortly.",
+        )
+
     # Verify that the requested video codec is available
     if video_codec is not None:
         video_codecs = [
@@ -199,3 +237,8 @@ async def validate_arguments(
                 status_code=400,
                 detail=f"Horizontal resolution must be an integer >= 1, got {vertical_resolution (type(vertical_resolution))}",
             )
+
+    # Validate the thread budget
+    if threads is not None:
+        if type(threads) != int or threads < 1:
+            raise ArgumentError(f"Threads must be an integer >= 1, got {threads}")
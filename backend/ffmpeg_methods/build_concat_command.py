@@ -0,0 +1,53 @@
+"""
+build_concat_command.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Build an FFmpeg command which joins files with the concat demuxer without re-encoding
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+
+
+async def build_concat_command(
+    input_filepaths: list,
+    list_filepath: str,
+    output_filepath: str,
+):
+    """
+    Write the concat list for the supplied files and build an FFmpeg command to join them.
+
+    The files must share the stream parameters reported by get_stream_parameters().
+    """
+    # Validate that output_filepath does not represent an existing file or directory
+    if os.path.exists(output_filepath):
+        raise FileExistsError(
+            f"{output_filepath} already exists and cannot be overwritten"
+        )
+
+    # Write the list of files to be read by the concat demuxer
+    with open(list_filepath, "w") as list_file:
+        for input_filepath in input_filepaths:
+            escaped_filepath = input_filepath.replace("'", "'\\''")
+            list_file.write(f"file '{escaped_filepath}'\n")
+
+    ffmpeg_command = [
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        list_filepath,
+        "-map",
+        "0:v:0?",
+        "-map",
+        "0:a:0?",
+        "-c",
+        "copy",
+        output_filepath,
+    ]
+    return ffmpeg_command
@@ -0,0 +1,104 @@
+"""
+build_conform_command.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Build an FFmpeg command which re-encodes a file to match a set of stream parameters
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from config import CODEC_ENCODERS, PRESET_ENCODERS, THROUGHPUT_PRESET, X264_PROFILES
+from exceptions import ArgumentError
+
+
+async def build_conform_command(
+    input_filepath: str,
+    output_filepath: str,
+    target: dict,
+    threads: int = None,
+    start: float = None,
+    duration: float = None,
+):
+    """
+    Build an FFmpeg command to re-encode the supplied media with the parameters from get_stream_parameters()
+
+    If start and duration are supplied, only that interval of the media is re-encoded.
+    """
+    ffmpeg_command = []
+    if threads:
+        ffmpeg_command.append("-threads")
+        ffmpeg_command.append(str(threads))
+    if start is not None:
+        ffmpeg_command.append("-ss")
+        ffmpeg_command.append(str(start))
+    ffmpeg_command.append("-i")
+    ffmpeg_command.append(input_filepath)
+    if duration is not None:
+        ffmpeg_command.append("-t")
+        ffmpeg_command.append(str(duration))
+
+    # Match the video codec, resolution, pixel format, aspect ratio, and frame rate
+    video = target.get("video")
+    if video:
+        ffmpeg_command.append("-map")
+        ffmpeg_command.append("0:v:0")
+        ffmpeg_command.append("-c:v")
+        ffmpeg_command.append(get_encoder(video["codec_name"]))
+
+        # Match the H.264 profile and level, so that the re-encoded video can be joined to
+        # stream copied video from the target without changing them mid-stream
+        if get_encoder(video["codec_name"]) == "libx264":
+            if video.get("profile") in X264_PROFILES:
+                ffmpeg_command.append("-profile:v")
+                ffmpeg_command.append(X264_PROFILES[video["profile"]])
+            if video.get("level") and video["level"] > 0:
+                ffmpeg_command.append("-level")
+                ffmpeg_command.append(str(video["level"]))
+        video_filters = [f"scale={video['width']}:{video['height']}"]
+        if video["sample_aspect_ratio"]:
+            video_filters.append(
+                f"setsar={video['sample_aspect_ratio'].replace(':', '/')}"
+            )
+        ffmpeg_command.append("-vf")
+        ffmpeg_command.append(",".join(video_filters))
+        if video["pix_fmt"]:
+            ffmpeg_command.append("-pix_fmt")
+            ffmpeg_command.append(video["pix_fmt"])
+        if video["r_frame_rate"]:
+            ffmpeg_command.append("-r")
+            ffmpeg_command.append(video["r_frame_rate"])
+
+    # Match the audio codec, sample rate, and channel layout
+    audio = target.get("audio")
+    if audio:
+        ffmpeg_command.append("-map")
+        ffmpeg_command.append("0:a:0")
+        ffmpeg_command.append("-c:a")
+        ffmpeg_command.append(get_encoder(audio["codec_name"]))
+        if audio["sample_rate"]:
+            ffmpeg_command.append("-ar")
+            ffmpeg_command.append(str(audio["sample_rate"]))
+        if audio["channels"]:
+            ffmpeg_command.append("-ac")
+            ffmpeg_command.append(str(audio["channels"]))
+
+    # Limit the encoders to the thread budget
+    if threads:
+        ffmpeg_command.append("-threads")
+        ffmpeg_command.append(str(threads))
+        if video and get_encoder(video["codec_name"]) in PRESET_ENCODERS:
+            ffmpeg_command.append("-preset")
+            ffmpeg_command.append(THROUGHPUT_PRESET)
+
+    # Add the output filepath
+    ffmpeg_command.append(output_filepath)
+    return ffmpeg_command
+
+
+def get_encoder(codec_name: str):
+    if codec_name not in CODEC_ENCODERS:
+        raise ArgumentError(f"Media cannot be re-encoded to the {codec_name} codec")
+    return CODEC_ENCODERS[codec_name]
@@ -0,0 +1,289 @@
+"""
+build_pipeline_command.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Compile a declarative pipeline into a single FFmpeg command
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+from fastapi import HTTPException
+from config import (
+    AVAILBLE_ENCODERS,
+    CODEC_ENCODERS,
+    ENCODER_DISCOVERY,
+    PRESET_ENCODERS,
+    THROUGHPUT_PRESET,
+)
+from exceptions import ArgumentError
+from models import Pipeline
+from environment.get_hardware_encoder import get_hardware_encoder
+from ffmpeg_methods.get_media_type import get_media_type
+from ffmpeg_methods.get_stream_parameters import get_stream_parameters
+
+
+async def build_pipeline_command(
+    input_filepaths: list,
+    output_filepaths: list,
+    pipeline: Pipeline,
+    threads: int = None,
+):
+    """
+    Build one FFmpeg command which runs every step of the pipeline and writes every output.
+
+    The shared steps become the head of a single filter graph, which is split once per
+    output that needs filtering. Outputs which need no filtering map the input streams
+    directly, so they can still be stream copied.
+    """
+    await validate_arguments(
+        input_filepaths=input_filepaths,
+        output_filepaths=output_filepaths,
+        pipeline=pipeline,
+    )
+    steps = {step.op: step for step in pipeline.steps}
+    trim = steps.get("trim")
+    scale = steps.get("scale")
+
+    # Find the inputs which supply the video and the audio
+    media_types = [await get_media_type(filepath) for filepath in input_filepaths]
+    video_input = next(
+        (i for i, t in enumerate(media_types) if t in ["Video", "Multimedia"]), None
+    )
+    audio_inputs = [
+        i for i, t in enumerate(media_types) if t in ["Audio", "Multimedia"]
+    ]
+    audio_input = next(
+        (i for i in audio_inputs if i != video_input),
+        audio_inputs[0] if audio_inputs else None,
+    )
+    if video_input is None:
+        if scale or any(
+            output.type == "thumbnail" or output.width or output.height
+            for output in pipeline.outputs
+        ):
+            raise ArgumentError("Scaling and thumbnails require an input with video")
+
+    # A merge takes one video and one audio, so every input must supply one of them
+    for index in range(len(input_filepaths)):
+        if len(input_filepaths) > 1 and index not in [video_input, audio_input]:
+            raise ArgumentError(
+                f"Input {index + 1} supplies neither the video nor the audio of the "
+                "merge. A merge takes the video of one input and the audio of another."
+            )
+
+    ffmpeg_command = []
+
+    # Limit the filter graph to the thread budget
+    if threads:
+        ffmpeg_command.append("-filter_complex_threads")
+        ffmpeg_command.append(str(threads))
+
+    hardware_encoder = get_hardware_encoder()
+    if hardware_encoder == "vaapi":
+        ffmpeg_command.append("-vaapi_device")
+        ffmpeg_command.append("/dev/dri/renderD128")
+
+    # Add the inputs, trimming them as they are read
+    for input_filepath in input_filepaths:
+        if threads:
+            ffmpeg_command.append("-threads")
+            ffmpeg_command.append(str(threads))
+        if trim:
+            ffmpeg_command.append("-ss")
+            ffmpeg_command.append(str(trim.start or 0))
+            if trim.end is not None:
+                ffmpeg_command.append("-t")
+                ffmpeg_command.append(str(trim.end - (trim.start or 0)))
+        ffmpeg_command.append("-i")
+        ffmpeg_command.append(input_filepath)
+
+    # Work out which outputs need their video filtered, and by which filters
+    shared_filters = [get_scale_filter(scale.width, scale.height)] if scale else []
+    branch_filters = []
+    for output in pipeline.outputs:
+        filters = []
+        if output.type == "thumbnail":
+            filters.append(f"trim=start={output.time}")
+        if output.width or output.height:
+            filters.append(get_scale_filter(output.width, output.height))
+        if output.video_codec and output.video_codec.endswith("_vaapi"):
+            filters.append("format=nv12|vaapi,hwupload")
+        branch_filters.append(filters)
+    filtered = [
+        video_input is not None and bool(shared_filters or filters)
+        for filters in branch_filters
+    ]
+
+    # Run the shared steps once, then split the result between the filtered outputs
+    filter_graph = []
+    branch_labels = {}
+    if any(filtered):
+        branches = [index for index in range(len(filtered)) if filtered[index]]
+        head_filters = list(shared_filters)
+        if len(branches) > 1:
+            head_filters.append(f"split={len(branches)}")
+        split_labels = "".join(f"[split{index}]" for index in branches)
+        filter_graph.append(
+            f"[{video_input}:v:0]{','.join(head_filters) or 'null'}{split_labels}"
+        )
+        for index in branches:
+            if branch_filters[index]:
+                filter_graph.append(
+                    f"[split{index}]{','.join(branch_filters[index])}[video{index}]"
+                )
+                branch_labels[index] = f"[video{index}]"
+            else:
+                branch_labels[index] = f"[split{index}]"
+        ffmpeg_command.append("-filter_complex")
+        ffmpeg_command.append(";".join(filter_graph))
+
+    # Add each output with its own streams and encoders
+    for index, output in enumerate(pipeline.outputs):
+        if output.type == "thumbnail":
+            ffmpeg_command += ["-map", branch_labels[index], "-frames:v", "1"]
+            ffmpeg_command += ["-update", "1", output_filepaths[index]]
+            continue
+
+        video_encoder = None
+        if video_input is not None:
+            if filtered[index]:
+                ffmpeg_command += ["-map", branch_labels[index]]
+            else:
+                ffmpeg_command += ["-map", f"{video_input}:v:0"]
+
+            # Filtered video, or video with a new bitrate, cannot be stream copied
+            video_encoder = output.video_codec
+            if video_encoder is None and (filtered[index] or output.video_bitrate):
+                video_encoder = await get_default_encoder(
+                    input_filepaths[video_input], "video"
+                )
+            ffmpeg_command += ["-c:v", video_encoder or "copy"]
+            if output.video_bitrate:
+                ffmpeg_command += ["-b:v", f"{output.video_bitrate}k"]
+
+        if audio_input is not None:
+            ffmpeg_command += ["-map", f"{audio_input}:a:0"]
+            audio_encoder = output.audio_codec
+            if audio_encoder is None and output.audio_bitrate:
+                audio_encoder = await get_default_encoder(
+                    input_filepaths[audio_input], "audio"
+                )
+            ffmpeg_command += ["-c:a", audio_encoder or "copy"]
+            if output.audio_bitrate:
+                ffmpeg_command += ["-b:a", f"{output.audio_bitrate}k"]
+
+        # Limit the encoders to the thread budget
+        if threads:
+            ffmpeg_command += ["-threads", str(threads)]
+            if video_encoder in PRESET_ENCODERS:
+                ffmpeg_command += ["-preset", THROUGHPUT_PRESET]
+
+        ffmpeg_command.append(output_filepaths[index])
+
+    return ffmpeg_command
+
+
+def get_scale_filter(width: int, height: int):
+    # If only one of the two resolutions is supplied, set the other to -1 to maintain aspect ratio
+    return f"scale={width or -1}:{height or -1}"
+
+
+async def get_default_encoder(filepath: str, stream_type: str):
+    """
+    Get the encoder which re-encodes a stream in the codec it already uses
+    """
+    codec_name = (await get_stream_parameters(filepath))[stream_type]["codec_name"]
+    if codec_name not in CODEC_ENCODERS:
+        raise ArgumentError(
+            f"The {stream_type} must be re-encoded, but no encoder is known for {codec_name}. "
+            f"Specify '{stream_type}_codec' for the output."
+        )
+    return CODEC_ENCODERS[codec_name]
+
+
+async def validate_arguments(
+    input_filepaths: list,
+    output_filepaths: list,
+    pipeline: Pipeline,
+):
+    """
+    Validate the arguments supplied to build_pipeline_command()
+    """
+    # Validate that the input files exist and are not directories
+    for input_filepath in input_filepaths:
+        if not os.path.exists(input_filepath):
+            raise FileNotFoundError
+        if not os.path.isfile(input_filepath):
+            raise IsADirectoryError
+
+    # Validate that the output filepaths do not represent existing files or directories
+    if len(output_filepaths) != len(pipeline.outputs):
+        raise ArgumentError("Every output of the pipeline requires an output filepath")
+    for output_filepath in output_filepaths:
+        if os.path.exists(output_filepath):
+            raise FileExistsError(
+                f"{output_filepath} already exists and cannot be overwritten"
+            )
+
+    # Validate the steps
+    ops = [step.op for step in pipeline.steps]
+    for op in set(ops):
+        if ops.count(op) > 1:
+            raise ArgumentError(f"The '{op}' step may only be used once")
+    if "merge" in ops and len(input_filepaths) < 2:
+        raise ArgumentError("The 'merge' step requires at least two inputs")
+    if "merge" not in ops and len(input_filepaths) > 1:
+        raise ArgumentError("Multiple inputs require a 'merge' step")
+    for step in pipeline.steps:
+        if step.op == "trim":
+            if (step.start or 0) < 0:
+                raise ArgumentError(f"Start must be >= 0, got {step.start}")
+            if step.end is not None and step.end <= (step.start or 0):
+                raise ArgumentError(
+                    f"End must be greater than start, got {step.start} to {step.end}"
+                )
+        if step.op == "scale":
+            validate_resolution(step.width, step.height)
+
+    # Validate the outputs
+    for output in pipeline.outputs:
+        validate_resolution(output.width, output.height)
+        if output.time < 0:
+            raise ArgumentError(f"Thumbnail time must be >= 0, got {output.time}")
+
+    # Verify that the requested codecs are available
+    requested_codecs = [
+        (codec, codec_type)
+        for output in pipeline.outputs
+        for codec, codec_type in [
+            (output.video_codec, "video"),
+            (output.audio_codec, "audio"),
+        ]
+        if codec is not None
+    ]
+    if requested_codecs and not ENCODER_DISCOVERY["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail="The available encoders are still being discovered. Try again shortly.",
+        )
+    for codec, codec_type in requested_codecs:
+        available_codecs = [
+            encoder["name"]
+            for encoder in AVAILBLE_ENCODERS
+            if encoder["type"] == codec_type
+        ]
+        if codec not in available_codecs:
+            raise HTTPException(
+                status_code=400,
+                detail=f"The requested {codec_type} codec, {codec}, is not available.",
+            )
+
+
+def validate_resolution(width: int, height: int):
+    for resolution in [width, height]:
+        if resolution is not None and resolution < 1:
+            raise ArgumentError(f"Resolutions must be integers >= 1, got {resolution}")
@@ -0,0 +1,48 @@
+"""
+discover_encoders.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Discover the available encoders, retrying until Docker is able to run FFmpeg
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+import logging
+from config import AVAILBLE_ENCODERS, ENCODER_DISCOVERY
+from ffmpeg_methods.get_encoders import get_encoders
+
+logger = logging.getLogger(__name__)
+
+# The longest wait between attempts, in seconds
+MAX_RETRY_DELAY = 60
+
+
+async def discover_encoders():
+    """
+    Fill AVAILBLE_ENCODERS and mark the discovery as ready.
+
+    A missing image or an unavailable Docker daemon is retried with exponential backoff
+    rather than treated as fatal.
+    """
+    delay = 1
+    while True:
+        logger.info("Getting the available encoders...")
+        try:
+            encoders = await get_encoders()
+            break
+        except Exception as e:
+            ENCODER_DISCOVERY["error"] = str(e)
+            logger.warning(
+                f"Failed to get the available encoders, retrying in {delay}s: {e}"
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    AVAILBLE_ENCODERS.extend(encoders)
+    ENCODER_DISCOVERY["ready"] = True
+    ENCODER_DISCOVERY["error"] = None
+    logger.info(f"Found {len(encoders)} encoders")
@@ -0,0 +1,294 @@
+"""
+get_audio_analysis.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the waveform peaks and loudness statistics of the audio in a file
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+import logging
+import math
+import ffmpeg
+import numpy as np
+from exceptions import ArgumentError, NotAnAudioError
+from ffmpeg_methods.get_media_type import get_media_type
+from ffmpeg_methods.probe_file import probe_file
+
+logger = logging.getLogger(__name__)
+
+# Decoded audio is analysed at a fixed rate so that the loudness blocks line up
+SAMPLE_RATE = 48000
+
+# Number of frames read from the pipe and reduced at once (one second of audio)
+CHUNK_FRAMES = SAMPLE_RATE
+
+# Loudness is measured over 400ms blocks overlapping by 75%, i.e. four 100ms sub-blocks
+SUBBLOCK_FRAMES = SAMPLE_RATE // 10
+SUBBLOCKS_PER_BLOCK = 4
+
+# Gated block loudnesses are kept in a fixed-size histogram so memory does not grow with duration
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+HISTOGRAM_CEILING = 10.0
+HISTOGRAM_RESOLUTION = 0.01
+
+# Peak bucket size used when ffprobe cannot report the duration (one second of audio)
+FALLBACK_SAMPLES_PER_PEAK = SAMPLE_RATE
+
+# Channel names used to lay out the decoded channels, in FFmpeg's native order. The
+# original channels take the first names and the K-weighted ones the names after them
+ANALYSIS_CHANNELS = (
+    "FL+FR+FC+LFE+BL+BR+FLC+FRC+BC+SL+SR+TC+TFL+TFC+TFR+TBL+TBC+TBR".split("+")
+)
+
+# The K-weighting filter of ITU-R BS.1770 as its two biquads, with the coefficients the
+# standard gives for 48kHz
+K_WEIGHTING = (
+    "biquad=b0=1.53512485958697:b1=-2.69169618940638:b2=1.19839281085285:"
+    "a0=1:a1=-1.69065929318241:a2=0.73248077421585,"
+    "biquad=b0=1:b1=-2:b2=1:a0=1:a1=-1.99004745483398:a2=0.99007225036621"
+)
+
+# Number of bytes of FFmpeg's error output kept for the error of a failed decode
+STDERR_BYTES = 64 * 1024
+
+
+async def get_audio_analysis(input_filepath: str, peaks: int = 1000, info: dict = None):
+    """
+    Get the waveform peaks, RMS, and an integrated loudness estimate of a supplied file.
+
+    The audio is decoded by FFmpeg into a pipe and reduced one chunk at a time, so the
+    full decoded signal is never held in memory.
+    """
+    # Reuse the output of ffprobe if the caller already has it
+    if info is None:
+        try:
+            info = await probe_file(input_filepath)
+        except ffmpeg.Error:
+            # A file which cannot be probed has no audio to analyse
+            raise NotAnAudioError(input_filepath)
+
+    # Verify that the input file is either audio or multimedia
+    media_type = await get_media_type(input_filepath, info=info)
+    if media_type not in ["Audio", "Multimedia"]:
+        raise NotAnAudioError(input_filepath)
+
+    # Size the peak buckets from the duration reported by ffprobe
+    audio_stream = next(s for s in info["streams"] if s["codec_type"] == "audio")
+    channels = int(audio_stream.get("channels", 1))
+    if channels * 2 > len(ANALYSIS_CHANNELS):
+        raise ArgumentError(
+            f"Audio with {channels} channels cannot be analysed. At most "
+            f"{len(ANALYSIS_CHANNELS) // 2} channels are supported."
+        )
+    duration = float(info["format"].get("duration", 0) or 0)
+    if duration > 0:
+        samples_per_peak = max(math.ceil(duration * SAMPLE_RATE / peaks), 1)
+    else:
+        samples_per_peak = FALLBACK_SAMPLES_PER_PEAK
+
+    # Decode into two parallel copies of the channels: the original ones for the
+    # waveform, and K-weighted ones for the loudness measurement. The copies are joined
+    # with an explicit channel map, as amerge reorders the channels of inputs whose
+    # layouts are disjoint
+    layout = ANALYSIS_CHANNELS[: channels * 2]
+    channel_map = "|".join(
+        f"{index // channels}.{index % channels}-{name}"
+        for index, name in enumerate(layout)
+    )
+    filter_graph = (
+        f"[0:a:0]aresample={SAMPLE_RATE},aformat=sample_fmts=flt,asplit=2[raw][kw];"
+        f"[kw]{K_WEIGHTING}[weighted];"
+        f"[raw][weighted]join=inputs=2:channel_layout={'+'.join(layout)}:"
+        f"map={channel_map}[analysis]"
+    )
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-v",
+        "error",
+        "-i",
+        input_filepath,
+        "-filter_complex",
+        filter_graph,
+        "-map",
+        "[analysis]",
+        "-f",
+        "f32le",
+        "-acodec",
+        "pcm_f32le",
+        "pipe:1",
+    ]
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    # Drain the error output while the audio is read, or a file with many decode errors
+    # fills the pipe and stalls FFmpeg
+    stderr = bytearray()
+    stderr_reader = asyncio.create_task(read_tail(process.stderr, stderr))
+
+    frame_width = channels * 2
+    frame_bytes = frame_width * 4
+    state = {
+        "frames": 0,
+        "peak": 0.0,
+        "sum_of_squares": 0.0,
+        "peak_min": [],
+        "peak_max": [],
+        "peak_buffer": np.empty(0, dtype=np.float32),
+        "power_buffer": np.empty(0, dtype=np.float64),
+        "subblocks": np.empty(0, dtype=np.float64),
+        "histogram_counts": np.zeros(histogram_size(), dtype=np.int64),
+        "histogram_powers": np.zeros(histogram_size(), dtype=np.float64),
+    }
+
+    # Read whole frames from the pipe, carrying any partial frame over to the next read.
+    # If the read is abandoned, e.g. because the client disconnected, stop FFmpeg with it
+    remainder = b""
+    try:
+        while True:
+            data = await process.stdout.read(CHUNK_FRAMES * frame_bytes)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % frame_bytes
+            remainder = data[usable:]
+            if usable:
+                chunk = np.frombuffer(data[:usable], dtype=np.float32)
+                reduce_chunk(
+                    state, chunk.reshape(-1, frame_width), channels, samples_per_peak
+                )
+
+        await stderr_reader
+        if await process.wait() != 0:
+            raise ffmpeg.Error("ffmpeg", None, bytes(stderr))
+    finally:
+        if process.returncode is None:
+            process.kill()
+            stderr_reader.cancel()
+            await asyncio.gather(stderr_reader, return_exceptions=True)
+            # Drain the pipes, or the exit of the process is never reported
+            await process.communicate()
+
+    # Flush the final partial peak bucket
+    if state["peak_buffer"].size:
+        state["peak_min"].append(float(state["peak_buffer"].min()))
+        state["peak_max"].append(float(state["peak_buffer"].max()))
+
+    rms = (
+        math.sqrt(state["sum_of_squares"] / state["frames"]) if state["frames"] else 0.0
+    )
+    return {
+        "sample_rate": SAMPLE_RATE,
+        "duration": state["frames"] / SAMPLE_RATE,
+        "samples_per_peak": samples_per_peak,
+        "peaks": {"min": state["peak_min"], "max": state["peak_max"]},
+        "peak": state["peak"],
+        "peak_dbfs": to_decibels(state["peak"]),
+        "rms": rms,
+        "rms_dbfs": to_decibels(rms),
+        "integrated_loudness": integrated_loudness(
+            state["histogram_counts"], state["histogram_powers"]
+        ),
+    }
+
+
+async def read_tail(stream: asyncio.StreamReader, tail: bytearray):
+    """
+    Read a stream to its end, keeping its last STDERR_BYTES bytes in tail
+    """
+    while data := await stream.read(STDERR_BYTES):
+        tail.extend(data)
+        del tail[:-STDERR_BYTES]
+
+
+def reduce_chunk(state: dict, chunk: np.ndarray, channels: int, samples_per_peak: int):
+    """
+    Fold one chunk of decoded frames, the original channels followed by the K-weighted
+    ones, into the running analysis state
+    """
+    mono = chunk[:, :channels].mean(axis=1, dtype=np.float32)
+    weighted = chunk[:, channels:].astype(np.float64)
+
+    # Overall peak and RMS
+    state["frames"] += mono.size
+    if mono.size:
+        state["peak"] = max(state["peak"], float(np.abs(mono).max()))
+    state["sum_of_squares"] += float(np.dot(mono, mono.astype(np.float64)))
+
+    # Min/max peaks for every complete bucket
+    samples = np.concatenate((state["peak_buffer"], mono))
+    complete = samples.size // samples_per_peak
+    if complete:
+        buckets = samples[: complete * samples_per_peak].reshape(
+            complete, samples_per_peak
+        )
+        state["peak_min"].extend(buckets.min(axis=1).tolist())
+        state["peak_max"].extend(buckets.max(axis=1).tolist())
+    state["peak_buffer"] = samples[complete * samples_per_peak :]
+
+    # Mean power of every complete 100ms sub-block, summed across channels
+    powers = np.concatenate((state["power_buffer"], np.square(weighted).sum(axis=1)))
+    complete = powers.size // SUBBLOCK_FRAMES
+    subblocks = powers[: complete * SUBBLOCK_FRAMES].reshape(complete, SUBBLOCK_FRAMES)
+    state["power_buffer"] = powers[complete * SUBBLOCK_FRAMES :]
+
+    # Combine consecutive sub-blocks into overlapping 400ms blocks
+    subblocks = np.concatenate((state["subblocks"], subblocks.mean(axis=1)))
+    if subblocks.size >= SUBBLOCKS_PER_BLOCK:
+        window = np.lib.stride_tricks.sliding_window_view(
+            subblocks, SUBBLOCKS_PER_BLOCK
+        )
+        accumulate_blocks(state, window.mean(axis=1))
+    state["subblocks"] = subblocks[-(SUBBLOCKS_PER_BLOCK - 1) :]
+
+
+def accumulate_blocks(state: dict, block_powers: np.ndarray):
+    """
+    Add block powers above the absolute gate to the loudness histogram
+    """
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(block_powers)
+    gated = loudness > ABSOLUTE_GATE
+    indexes = np.clip(
+        ((loudness[gated] - ABSOLUTE_GATE) / HISTOGRAM_RESOLUTION).astype(np.int64),
+        0,
+        histogram_size() - 1,
+    )
+    state["histogram_counts"] += np.bincount(indexes, minlength=histogram_size())
+    state["histogram_powers"] += np.bincount(
+        indexes, weights=block_powers[gated], minlength=histogram_size()
+    )
+
+
+def integrated_loudness(counts: np.ndarray, powers: np.ndarray):
+    """
+    Apply the relative gate to the block histogram and return the integrated loudness in LUFS
+    """
+    if not counts.sum():
+        return None
+    relative_gate = (
+        -0.691 + 10 * math.log10(powers.sum() / counts.sum()) + RELATIVE_GATE
+    )
+    start = max(int((relative_gate - ABSOLUTE_GATE) / HISTOGRAM_RESOLUTION), 0)
+    if not counts[start:].sum():
+        return None
+    return -0.691 + 10 * math.log10(powers[start:].sum() / counts[start:].sum())
+
+
+def histogram_size():
+    return int((HISTOGRAM_CEILING - ABSOLUTE_GATE) / HISTOGRAM_RESOLUTION)
+
+
+def to_decibels(amplitude: float):
+    if amplitude <= 0:
+        return None
+    return 20 * math.log10(amplitude)
@@ -11,18 +11,19 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import logging
-import ffmpeg
+from ffmpeg_methods.probe_file import probe_file
 
 logger = logging.getLogger(__name__)
 
 
-async def get_bitrate(input_filepath):
+async def get_bitrate(input_filepath, info: dict = None):
     """
     Get the bitrate of a supplied file
     """
     bitrate = {}
-    # Use ffprobe to get info about the video
-    info = ffmpeg.probe(input_filepath)
+    # Use ffprobe to get info about the video, unless the caller already has it
+    if info is None:
+        info = await probe_file(input_filepath)
 
     # Extract the first video stream information
     video_stream = next(
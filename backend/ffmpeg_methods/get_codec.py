@@ -10,13 +10,15 @@ All rights reserved. This file is part of the FFmpeg-API project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
-import ffmpeg
+from ffmpeg_methods.probe_file import probe_file
 from ffmpeg_methods.get_media_type import get_media_type
 
 
-async def get_codec(filepath):
-    info = ffmpeg.probe(filepath)
-    media_type = await get_media_type(filepath)
+async def get_codec(filepath, info: dict = None):
+    # Reuse the output of ffprobe if the caller already has it
+    if info is None:
+        info = await probe_file(filepath)
+    media_type = await get_media_type(filepath, info=info)
     result = {}
     if media_type == "Multimedia" or media_type == "Audio":
         audio_stream = next(s for s in info["streams"] if s["codec_type"] == "audio")
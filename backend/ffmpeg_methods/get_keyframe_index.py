@@ -0,0 +1,97 @@
+"""
+get_keyframe_index.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the persisted keyframe index of a media file, building it on first use
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+import secrets
+import ffmpeg
+import numpy as np
+from config import KEYFRAME_INDEX_DIRECTORY
+
+
+async def get_keyframe_index(filepath):
+    """
+    Get an array of (timestamp, byte offset) pairs for the video keyframes of a file.
+
+    The index is built from the packet flags in a single pass over the file and saved
+    alongside the other indexes, so later calls only read the saved copy. A byte offset
+    of -1 means the demuxer did not report one.
+    """
+    index_filepath = get_keyframe_index_filepath(filepath)
+
+    # Use the saved index unless the file has been replaced since it was built
+    if os.path.exists(index_filepath) and os.path.getmtime(
+        index_filepath
+    ) >= os.path.getmtime(filepath):
+        return np.load(index_filepath)
+
+    # Stream the packets from ffprobe one line at a time, keeping only the keyframes,
+    # so that the packet list of a long file is never held in memory
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,pos,flags",
+        "-of",
+        "csv=print_section=0:nokey=0",
+        filepath,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    keyframes = []
+    try:
+        async for line in process.stdout:
+            packet = dict(
+                field.split("=", 1)
+                for field in line.decode().strip().split(",")
+                if "=" in field
+            )
+            if (
+                "K" not in packet.get("flags", "")
+                or packet.get("pts_time", "N/A") == "N/A"
+            ):
+                continue
+            position = packet.get("pos", "N/A")
+            keyframes.append(
+                (float(packet["pts_time"]), int(position) if position != "N/A" else -1)
+            )
+
+        stderr = await process.stderr.read()
+        if await process.wait() != 0:
+            raise ffmpeg.Error("ffprobe", None, stderr)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            # Drain the pipes, or the exit of the process is never reported
+            await process.communicate()
+    index = np.array(sorted(keyframes), dtype=np.float64).reshape(-1, 2)
+
+    # Write to a temporary file first so that concurrent readers never see a partial index
+    os.makedirs(KEYFRAME_INDEX_DIRECTORY, exist_ok=True)
+    temporary_filepath = f"{index_filepath}.{secrets.token_hex(4)}.tmp"
+    with open(temporary_filepath, "wb") as index_file:
+        np.save(index_file, index)
+
+    # Do not save the index of a file which was deleted while the index was being built
+    if not os.path.exists(filepath):
+        os.remove(temporary_filepath)
+        return index
+    os.replace(temporary_filepath, index_filepath)
+
+    return index
+
+
+def get_keyframe_index_filepath(filepath):
+    return os.path.join(KEYFRAME_INDEX_DIRECTORY, f"{os.path.basename(filepath)}.npy")
@@ -0,0 +1,48 @@
+"""
+get_keyframes.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the timestamps of the video keyframes in a file
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+import ffmpeg
+import numpy as np
+from config import MEDIA_DIRECTORY
+from ffmpeg_methods.get_keyframe_index import get_keyframe_index
+
+
+async def get_keyframes(filepath, start: float, end: float):
+    """
+    Get the timestamps of the video keyframes between start and end, in seconds.
+
+    Stored media is looked up in its keyframe index. Otherwise, only the packet headers
+    within the interval are read, so the rest of the file is skipped.
+    """
+    if os.path.dirname(filepath) == MEDIA_DIRECTORY:
+        timestamps = (await get_keyframe_index(filepath))[:, 0]
+        first = np.searchsorted(timestamps, start, side="left")
+        last = np.searchsorted(timestamps, end, side="right")
+        return timestamps[first:last].tolist()
+
+    info = await asyncio.to_thread(
+        ffmpeg.probe,
+        filepath,
+        select_streams="v:0",
+        show_entries="packet=pts_time,flags",
+        read_intervals=f"{start}%{end}",
+    )
+    keyframes = []
+    for packet in info.get("packets", []):
+        if "K" not in packet.get("flags", "") or "pts_time" not in packet:
+            continue
+        timestamp = float(packet["pts_time"])
+        if start <= timestamp <= end:
+            keyframes.append(timestamp)
+    return sorted(keyframes)
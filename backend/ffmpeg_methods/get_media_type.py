@@ -11,11 +11,14 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import ffmpeg
+from ffmpeg_methods.probe_file import probe_file
 
 
-async def get_media_type(filepath):
+async def get_media_type(filepath, info: dict = None):
     try:
-        info = ffmpeg.probe(filepath)
+        # Reuse the output of ffprobe if the caller already has it
+        if info is None:
+            info = await probe_file(filepath)
         has_video = any(stream["codec_type"] == "video" for stream in info["streams"])
         has_audio = any(stream["codec_type"] == "audio" for stream in info["streams"])
 
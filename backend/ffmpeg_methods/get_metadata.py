@@ -0,0 +1,34 @@
+"""
+get_metadata.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the media type, codec, bitrate, and resolution of a file from a single probe
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from ffmpeg_methods.probe_file import probe_file
+from ffmpeg_methods.get_bitrate import get_bitrate
+from ffmpeg_methods.get_codec import get_codec
+from ffmpeg_methods.get_media_type import get_media_type
+from ffmpeg_methods.get_resolution import get_resolution
+
+
+async def get_metadata(filepath):
+    """
+    Probe a file once in the probe pool and derive all of its metadata from the result
+    """
+    info = await probe_file(filepath)
+
+    media_type = await get_media_type(filepath, info=info)
+    metadata = {
+        "media_type": media_type,
+        "codec": await get_codec(filepath, info=info),
+        "bitrate": await get_bitrate(filepath, info=info),
+    }
+    if media_type in ["Video", "Multimedia"]:
+        metadata["resolution"] = await get_resolution(filepath, info=info)
+    return metadata
@@ -11,18 +11,26 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import ffmpeg
+from ffmpeg_methods.probe_file import probe_file
 from ffmpeg_methods.get_media_type import get_media_type
 from exceptions import NotAVideoError
 
 
-async def get_resolution(input_filepath):
+async def get_resolution(input_filepath, info: dict = None):
+    # Reuse the output of ffprobe if the caller already has it
+    if info is None:
+        try:
+            info = await probe_file(input_filepath)
+        except ffmpeg.Error:
+            # A file which cannot be probed is not a video
+            raise NotAVideoError(input_filepath)
+
     # Verify that the input file is eithe video or multimedia
-    media_type = await get_media_type(input_filepath)
+    media_type = await get_media_type(input_filepath, info=info)
     if media_type not in ["Video", "Multimedia"]:
         raise NotAVideoError(input_filepath)
 
     # Get the resolution of the video stream
-    info = ffmpeg.probe(input_filepath)
     video_streams = [
         stream for stream in info["streams"] if stream["codec_type"] == "video"
     ]
@@ -0,0 +1,57 @@
+"""
+get_stream_parameters.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the stream parameters which must match for media files to be joined without re-encoding
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+import ffmpeg
+
+VIDEO_PARAMETERS = [
+    "codec_name",
+    "profile",
+    "level",
+    "width",
+    "height",
+    "pix_fmt",
+    "sample_aspect_ratio",
+    "r_frame_rate",
+]
+AUDIO_PARAMETERS = ["codec_name", "sample_rate", "channels", "channel_layout"]
+
+
+async def get_stream_parameters(filepath):
+    """
+    Get the parameters of the first video and audio streams of a supplied file
+    """
+    # Probe from a worker thread so that several files can be probed concurrently
+    info = await asyncio.to_thread(ffmpeg.probe, filepath)
+
+    # Ignore cover art, which ffprobe reports as a video stream
+    streams = [
+        stream
+        for stream in info["streams"]
+        if not stream.get("disposition", {}).get("attached_pic")
+    ]
+
+    parameters = {}
+    video_stream = next((s for s in streams if s["codec_type"] == "video"), None)
+    if video_stream:
+        parameters["video"] = {key: video_stream.get(key) for key in VIDEO_PARAMETERS}
+    audio_stream = next((s for s in streams if s["codec_type"] == "audio"), None)
+    if audio_stream:
+        parameters["audio"] = {key: audio_stream.get(key) for key in AUDIO_PARAMETERS}
+    return parameters
+
+
+def get_common_parameters(parameters: list):
+    """
+    Get the stream parameters shared by the greatest number of the supplied files
+    """
+    return max(parameters, key=parameters.count)
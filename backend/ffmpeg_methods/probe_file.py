@@ -0,0 +1,28 @@
+"""
+probe_file.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Probe a file with ffprobe without blocking the event loop
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import ffmpeg
+from config import PROBE_WORKERS
+
+# ffprobe runs in its own process, so a bounded pool of threads waiting on it is enough
+# to keep every core busy without pickling results between processes
+PROBE_EXECUTOR = ThreadPoolExecutor(max_workers=PROBE_WORKERS)
+
+
+async def probe_file(filepath):
+    """
+    Return the output of ffprobe for a file, waiting on it in the probe pool
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(PROBE_EXECUTOR, ffmpeg.probe, filepath)
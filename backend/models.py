@@ -0,0 +1,53 @@
+"""
+models.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Define request models
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class PipelineStep(BaseModel):
+    """
+    A step applied to the media before it is split into the outputs.
+
+    merge: take the video from one input and the audio from another
+    trim: keep only the interval between start and end, in seconds
+    scale: resize the video to width x height, where a missing side keeps the aspect ratio
+    """
+
+    op: Literal["merge", "trim", "scale"]
+    start: Optional[float] = None
+    end: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class PipelineOutput(BaseModel):
+    """
+    A file produced by the pipeline: either media or a single-frame thumbnail.
+
+    Thumbnails are taken at time, in seconds, after any trim has been applied.
+    """
+
+    type: Literal["media", "thumbnail"] = "media"
+    extension: Optional[str] = None
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    video_bitrate: Optional[int] = None
+    audio_bitrate: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    time: float = 0
+
+
+class Pipeline(BaseModel):
+    steps: List[PipelineStep] = []
+    outputs: List[PipelineOutput] = Field(min_length=1)
@@ -0,0 +1,39 @@
+"""
+enqueue_job.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Add a job to the queue
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import time
+import asyncio
+import secrets
+from contextlib import closing
+from queue_methods.get_connection import get_connection
+
+
+async def enqueue_job(kind: str, arguments: dict):
+    """
+    Add a job to the queue and return its job id
+    """
+    job_id = secrets.token_hex(8)
+    await asyncio.to_thread(enqueue_job_blocking, job_id, kind, arguments)
+    return job_id
+
+
+def enqueue_job_blocking(job_id: str, kind: str, arguments: dict):
+    now = time.time()
+    with closing(get_connection()) as connection:
+        connection.execute(
+            """
+            INSERT INTO jobs (job_id, kind, arguments, status, created_at, updated_at)
+            VALUES (?, ?, ?, 'queued', ?, ?)
+            """,
+            (job_id, kind, json.dumps(arguments), now, now),
+        )
@@ -0,0 +1,84 @@
+"""
+finish_job.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Record the outcome of a job
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import time
+import asyncio
+from contextlib import closing
+from queue_methods.get_connection import get_connection
+
+
+async def complete_job(job_id: str, worker_id: str, result=None):
+    """
+    Mark a job as succeeded, unless its lease has since passed to another worker
+    """
+    await finish_job(job_id, worker_id, "succeeded", result=json.dumps(result))
+
+
+async def fail_job(job_id: str, worker_id: str, error_status: int, error_detail: str):
+    """
+    Mark a job as failed, unless its lease has since passed to another worker
+    """
+    await finish_job(
+        job_id,
+        worker_id,
+        "failed",
+        error_status=error_status,
+        error_detail=error_detail,
+    )
+
+
+async def finish_job(
+    job_id: str,
+    worker_id: str,
+    status: str,
+    result: str = None,
+    error_status: int = None,
+    error_detail: str = None,
+):
+    await asyncio.to_thread(
+        finish_job_blocking,
+        job_id,
+        worker_id,
+        status,
+        result,
+        error_status,
+        error_detail,
+    )
+
+
+def finish_job_blocking(
+    job_id: str,
+    worker_id: str,
+    status: str,
+    result: str,
+    error_status: int,
+    error_detail: str,
+):
+    with closing(get_connection()) as connection:
+        connection.execute(
+            """
+            UPDATE jobs
+            SET status = ?, result = ?, error_status = ?, error_detail = ?,
+                lease_expires_at = NULL, updated_at = ?
+            WHERE job_id = ? AND worker_id = ? AND status = 'running'
+            """,
+            (
+                status,
+                result,
+                error_status,
+                error_detail,
+                time.time(),
+                job_id,
+                worker_id,
+            ),
+        )
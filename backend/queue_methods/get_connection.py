@@ -0,0 +1,76 @@
+"""
+get_connection.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Open a connection to the job queue, creating its tables if necessary
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import sqlite3
+import threading
+from config import QUEUE_PATH
+
+# The queue databases whose schema has been created by this process. Connections are
+# opened from worker threads, so the check is made under a lock
+INITIALIZED_QUEUES = set()
+INITIALIZATION_LOCK = threading.Lock()
+
+
+def get_connection():
+    """
+    Open a connection to the queue, creating its schema on the first connection.
+
+    The queue functions call this from worker threads, via asyncio.to_thread, so that
+    waiting on the database lock never blocks the event loop.
+    """
+    with INITIALIZATION_LOCK:
+        initialized = QUEUE_PATH in INITIALIZED_QUEUES
+        if not initialized:
+            os.makedirs(os.path.dirname(QUEUE_PATH), exist_ok=True)
+
+        # Statements are committed as they run unless a transaction is opened explicitly
+        connection = sqlite3.connect(QUEUE_PATH, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        if not initialized:
+            initialize_queue(connection)
+            INITIALIZED_QUEUES.add(QUEUE_PATH)
+    return connection
+
+
+def initialize_queue(connection: sqlite3.Connection):
+    # WAL keeps readers from blocking the writer. The mode is stored in the database, so
+    # it only needs to be set once. It needs memory shared between the processes, so the
+    # queue only works for processes on one host
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            arguments TEXT NOT NULL,
+            status TEXT NOT NULL,
+            worker_id TEXT,
+            lease_expires_at REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error_status INTEGER,
+            error_detail TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            encoders TEXT NOT NULL,
+            last_seen_at REAL NOT NULL
+        )
+        """
+    )
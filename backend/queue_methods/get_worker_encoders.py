@@ -0,0 +1,39 @@
+"""
+get_worker_encoders.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the encoders offered by the workers which are alive
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import time
+import asyncio
+from contextlib import closing
+from config import LEASE_SECONDS
+from queue_methods.get_connection import get_connection
+
+
+async def get_worker_encoders():
+    """
+    Get the encoders reported by the most recently seen live worker
+    """
+    return await asyncio.to_thread(get_worker_encoders_blocking)
+
+
+def get_worker_encoders_blocking():
+    with closing(get_connection()) as connection:
+        row = connection.execute(
+            """
+            SELECT encoders FROM workers WHERE last_seen_at >= ?
+            ORDER BY last_seen_at DESC LIMIT 1
+            """,
+            (time.time() - LEASE_SECONDS,),
+        ).fetchone()
+    if row is None:
+        return []
+    return json.loads(row["encoders"])
@@ -0,0 +1,81 @@
+"""
+lease_job.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Lease the oldest available job in the queue to a worker
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import time
+import asyncio
+from contextlib import closing
+from config import LEASE_SECONDS, MAX_ATTEMPTS
+from queue_methods.get_connection import get_connection
+
+
+async def lease_job(worker_id: str):
+    """
+    Lease the oldest queued job, or the oldest job whose worker stopped sending heartbeats.
+
+    Returns the job as a dictionary, or None if there is nothing to do.
+    """
+    return await asyncio.to_thread(lease_job_blocking, worker_id)
+
+
+def lease_job_blocking(worker_id: str):
+    now = time.time()
+    with closing(get_connection()) as connection:
+        # Take the write lock up front so that two workers cannot lease the same job
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Give up on jobs which have already been leased too many times
+            connection.execute(
+                """
+                UPDATE jobs
+                SET status = 'failed', error_status = 500,
+                    error_detail = 'The job was abandoned by too many workers',
+                    updated_at = ?
+                WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?
+                """,
+                (now, now, MAX_ATTEMPTS),
+            )
+            row = connection.execute(
+                """
+                SELECT * FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?)
+                ORDER BY created_at
+                LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+
+            connection.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', worker_id = ?, lease_expires_at = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (worker_id, now + LEASE_SECONDS, now, row["job_id"]),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    job = dict(row)
+    job["arguments"] = json.loads(job["arguments"])
+    job["status"] = "running"
+    job["worker_id"] = worker_id
+    job["lease_expires_at"] = now + LEASE_SECONDS
+    job["attempts"] += 1
+    job["updated_at"] = now
+    return job
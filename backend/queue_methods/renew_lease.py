@@ -0,0 +1,37 @@
+"""
+renew_lease.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Extend a worker's lease on a job
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import time
+import asyncio
+from contextlib import closing
+from config import LEASE_SECONDS
+from queue_methods.get_connection import get_connection
+
+
+async def renew_lease(job_id: str, worker_id: str):
+    """
+    Extend the lease on a job, returning False if the job is no longer held by the worker
+    """
+    return await asyncio.to_thread(renew_lease_blocking, job_id, worker_id)
+
+
+def renew_lease_blocking(job_id: str, worker_id: str):
+    now = time.time()
+    with closing(get_connection()) as connection:
+        cursor = connection.execute(
+            """
+            UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+            WHERE job_id = ? AND worker_id = ? AND status = 'running'
+            """,
+            (now + LEASE_SECONDS, now, job_id, worker_id),
+        )
+    return cursor.rowcount == 1
@@ -0,0 +1,33 @@
+"""
+report_heartbeat.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Report that a worker is alive, along with the encoders it offers
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import time
+import asyncio
+from contextlib import closing
+from queue_methods.get_connection import get_connection
+
+
+async def report_heartbeat(worker_id: str, encoders: list):
+    await asyncio.to_thread(report_heartbeat_blocking, worker_id, encoders)
+
+
+def report_heartbeat_blocking(worker_id: str, encoders: list):
+    with closing(get_connection()) as connection:
+        connection.execute(
+            """
+            INSERT INTO workers (worker_id, encoders, last_seen_at) VALUES (?, ?, ?)
+            ON CONFLICT (worker_id) DO UPDATE SET
+                encoders = excluded.encoders, last_seen_at = excluded.last_seen_at
+            """,
+            (worker_id, json.dumps(encoders), time.time()),
+        )
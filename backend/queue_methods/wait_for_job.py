@@ -0,0 +1,81 @@
+"""
+wait_for_job.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Wait for a queued job to finish
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import time
+import asyncio
+from contextlib import closing
+from config import JOB_TIMEOUT_SECONDS, POLL_SECONDS, QUEUE_TIMEOUT_SECONDS
+from exceptions import JobFailedError
+from queue_methods.get_connection import get_connection
+
+
+async def wait_for_job(job_id: str):
+    """
+    Poll the queue until a job finishes, returning its result or raising JobFailedError.
+
+    A job which no worker leases within QUEUE_TIMEOUT_SECONDS fails with a 503, and a job
+    which does not finish within JOB_TIMEOUT_SECONDS fails with a 504. Either way the job
+    is failed in the queue, so that no worker runs it for a request which has gone.
+    """
+    started_at = time.time()
+    while True:
+        row = await asyncio.to_thread(get_job_blocking, job_id)
+        if row is None:
+            raise JobFailedError(500, f"The job {job_id} is no longer in the queue")
+        if row["status"] == "succeeded":
+            return json.loads(row["result"])
+        if row["status"] == "failed":
+            raise JobFailedError(row["error_status"], row["error_detail"])
+
+        waited = time.time() - started_at
+        if row["status"] == "queued" and waited > QUEUE_TIMEOUT_SECONDS:
+            error = (503, "No worker picked up the job. Try again later.")
+        elif waited > JOB_TIMEOUT_SECONDS:
+            error = (504, "The job did not finish in time")
+        else:
+            await asyncio.sleep(POLL_SECONDS)
+            continue
+
+        # Fail the job so that no worker runs it, unless it finished in the meantime
+        if await abandon_job(job_id, *error):
+            raise JobFailedError(*error)
+
+
+async def abandon_job(job_id: str, error_status: int, error_detail: str):
+    """
+    Fail a job which is still queued or running, returning False if it already finished
+    """
+    return await asyncio.to_thread(
+        abandon_job_blocking, job_id, error_status, error_detail
+    )
+
+
+def get_job_blocking(job_id: str):
+    with closing(get_connection()) as connection:
+        return connection.execute(
+            "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+
+
+def abandon_job_blocking(job_id: str, error_status: int, error_detail: str):
+    with closing(get_connection()) as connection:
+        cursor = connection.execute(
+            """
+            UPDATE jobs
+            SET status = 'failed', error_status = ?, error_detail = ?,
+                lease_expires_at = NULL, updated_at = ?
+            WHERE job_id = ? AND status IN ('queued', 'running')
+            """,
+            (error_status, error_detail, time.time(), job_id),
+        )
+    return cursor.rowcount == 1
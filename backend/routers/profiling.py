@@ -0,0 +1,98 @@
+"""
+profiling.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Profile requests with cProfile and store the results in pstats format
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import asyncio
+import cProfile
+import logging
+import secrets
+from fastapi import Request
+from config import PROFILE_DIRECTORY, PROFILE_RETENTION
+from environment.get_profiling_mode import get_profiling_mode
+
+logger = logging.getLogger(__name__)
+
+# cProfile hooks the whole event loop thread, so only one request is profiled at a time
+PROFILER_LOCK = asyncio.Lock()
+
+# The values of the "X-Profile" header and "profile" query parameter which ask for a profile
+PROFILE_REQUESTED = ["1", "true", "yes", "on"]
+
+
+def is_profile_requested(request: Request):
+    """
+    Check whether the request asks to be profiled
+    """
+    for value in [
+        request.headers.get("X-Profile"),
+        request.query_params.get("profile"),
+    ]:
+        if value is not None and value.strip().lower() in PROFILE_REQUESTED:
+            return True
+    return False
+
+
+def prune_profiles():
+    """
+    Delete the oldest stored profiles beyond the retention limit
+    """
+    profiles = []
+    for entry in os.scandir(PROFILE_DIRECTORY):
+        if entry.name.endswith(".pstats"):
+            try:
+                profiles.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    profiles.sort(reverse=True)
+    for _, filepath in profiles[PROFILE_RETENTION:]:
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+
+
+async def profile_requests(request: Request, call_next):
+    """
+    Profile the request if asked to, and return the id of the stored profile in the
+    "X-Profile-Id" header.
+
+    cProfile records everything that runs on the event loop thread while the request is
+    in progress, so the profile also includes the work of any other requests handled
+    concurrently. The "X-Profile-Scope" header says as much. Work done in worker
+    threads, such as waiting on FFmpeg containers, is not captured, and neither is the
+    streaming of a file response.
+    """
+    if get_profiling_mode() != "always" and not is_profile_requested(request):
+        return await call_next(request)
+
+    if PROFILER_LOCK.locked():
+        response = await call_next(request)
+        response.headers["X-Profile-Skipped"] = "Another request is being profiled"
+        return response
+
+    async with PROFILER_LOCK:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+
+        profile_id = secrets.token_hex(8)
+        os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIRECTORY, f"{profile_id}.pstats"))
+        await asyncio.to_thread(prune_profiles)
+
+    logger.info(f"Profiled {request.method} {request.url.path} as {profile_id}")
+    response.headers["X-Profile-Id"] = profile_id
+    response.headers["X-Profile-Scope"] = "event-loop"
+    return response
@@ -10,23 +10,63 @@ All rights reserved. This file is part of the FFmpeg-API project and is released
 the MIT License. See the LICENSE file for more details.
 """
 
+import io
 import os
+import re
+import json
+import asyncio
 import logging
-import shutil
+import pstats
+import ffmpeg
 import secrets
-from fastapi import APIRouter, BackgroundTasks, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
-from config import AVAILBLE_ENCODERS
-from routers.tasks import remove_file
-from exceptions import NotAVideoError
-from docker_methods.generate_parameters import generate_parameters
-from docker_methods.run_container import run_container
+from typing import List
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    UploadFile,
+    File,
+    Form,
+    HTTPException,
+    Query,
+)
+from pydantic import ValidationError
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from config import (
+    AVAILBLE_ENCODERS,
+    ENCODER_DISCOVERY,
+    MEDIA_DIRECTORY,
+    PROFILE_DIRECTORY,
+)
+from models import Pipeline
+from routers.tasks import build_keyframe_index, remove_file, remove_files
+from routers.single_flight import single_flight, get_flight_key
+from exceptions import (
+    ArgumentError,
+    FFmpegError,
+    JobFailedError,
+    MediaNotFoundError,
+    NotAVideoError,
+    NotAnAudioError,
+)
+from docker_methods.execute_job import execute_job
+from environment.get_role import get_role
 from ffmpeg_methods.get_encoders import get_encoders
 from ffmpeg_methods.get_codec import get_codec
 from ffmpeg_methods.get_bitrate import get_bitrate
 from ffmpeg_methods.get_media_type import get_media_type
 from ffmpeg_methods.get_resolution import get_resolution
-from ffmpeg_methods.build_command import build_command
+from ffmpeg_methods.get_metadata import get_metadata
+from ffmpeg_methods.get_keyframe_index import (
+    get_keyframe_index,
+    get_keyframe_index_filepath,
+)
+from queue_methods.enqueue_job import enqueue_job
+from queue_methods.wait_for_job import wait_for_job
+from queue_methods.get_worker_encoders import get_worker_encoders
+from storage_methods.save_input import save_input
+from storage_methods.save_upload import save_upload
+from storage_methods.store_media import store_media
+from storage_methods.get_media_filepath import get_media_filepath
 
 # Instantiate a new router
 router = APIRouter()
@@ -34,16 +74,138 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+@router.get("/healthz", status_code=200)
+async def healthz():
+    """
+    Report that the application is alive
+    """
+    return {"status": "ok"}
+
+
+@router.get("/readyz", status_code=200)
+async def readyz():
+    """
+    Report whether the application is ready to encode
+    """
+    # API nodes hand encodes to workers, so they are ready as soon as they are serving
+    if get_role() != "api" and not ENCODER_DISCOVERY["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "status": "discovering encoders",
+                "error": ENCODER_DISCOVERY["error"],
+            },
+        )
+    return {"status": "ready"}
+
+
+@router.get("/profiles/{profile_id}", status_code=200)
+async def profile(profile_id: str, format: str = "pstats"):
+    """
+    Return a stored request profile, either as a pstats file or as a text summary
+    """
+    profile_filepath = os.path.join(PROFILE_DIRECTORY, f"{profile_id}.pstats")
+    if not re.fullmatch(r"[0-9a-f]{16}", profile_id) or not os.path.exists(
+        profile_filepath
+    ):
+        raise HTTPException(
+            status_code=404, detail=f"No stored profile has the id {profile_id}"
+        )
+
+    match format:
+        case "pstats":
+            return FileResponse(path=profile_filepath, filename=f"{profile_id}.pstats")
+        case "text":
+            summary = io.StringIO()
+            stats = pstats.Stats(profile_filepath, stream=summary)
+            stats.sort_stats("cumulative").print_stats(50)
+            return PlainTextResponse(summary.getvalue())
+        case _:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Parameter 'format' must be 'pstats' or 'text', got {format}",
+            )
+
+
 @router.get("/encoders", status_code=200)
 async def encoders():
     """
     Return the available encoders
     """
+    # API nodes do not encode, so report the encoders of the workers instead
+    if get_role() == "api":
+        return {"encoders": await get_worker_encoders()}
+    if not ENCODER_DISCOVERY["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail="The available encoders are still being discovered. Try again shortly.",
+        )
     return {"encoders": AVAILBLE_ENCODERS}
 
 
+@router.post("/media", status_code=201)
+async def upload_media(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """
+    Store a supplied file so that it can be referenced by its media id in later requests
+    """
+    media_id = await store_media(file)
+
+    # Build the keyframe index now so that the first seek does not have to scan the file
+    background_tasks.add_task(build_keyframe_index, get_media_filepath(media_id))
+    return {"media_id": media_id}
+
+
+@router.get("/media/{media_id}", status_code=200)
+async def download_media(media_id: str):
+    """
+    Return a stored file
+    """
+    try:
+        media_filepath = get_media_filepath(media_id)
+    except MediaNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+    return FileResponse(path=media_filepath, filename=os.path.basename(media_filepath))
+
+
+@router.get("/media/{media_id}/keyframes", status_code=200)
+async def media_keyframes(media_id: str):
+    """
+    Return the timestamps and byte offsets of the video keyframes of a stored file
+    """
+    try:
+        media_filepath = get_media_filepath(media_id)
+    except MediaNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+    try:
+        index = await get_keyframe_index(media_filepath)
+    except ffmpeg.Error as e:
+        raise HTTPException(
+            status_code=422,
+            detail=e.stderr.decode("utf-8", errors="ignore").strip(),
+        )
+    return {
+        "timestamps": index[:, 0].tolist(),
+        "positions": index[:, 1].astype(int).tolist(),
+    }
+
+
+@router.delete("/media/{media_id}", status_code=204)
+async def delete_media(media_id: str):
+    """
+    Remove a stored file and its keyframe index
+    """
+    try:
+        media_filepath = get_media_filepath(media_id)
+    except MediaNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+    os.remove(media_filepath)
+    index_filepath = get_keyframe_index_filepath(media_filepath)
+    if os.path.exists(index_filepath):
+        os.remove(index_filepath)
+
+
 @router.get("/codec", status_code=200)
-async def codec(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def codec(file: UploadFile = File(...)):
     """
     Return the codec of a supplied file
     """
@@ -51,15 +213,19 @@ async def codec(background_tasks: BackgroundTasks, file: UploadFile = File(...))
     extension = file.filename.split(".")[-1]
     input_filepath = os.path.join("/storage", f"{file_id}-input.{extension}")
     # Save the file to the storage directory
-    with open(input_filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    codec = await get_codec(input_filepath)
-    background_tasks.add_task(remove_file, input_filepath)
-    return codec
+    content_hash = await save_upload(file, input_filepath)
+
+    # Share the result with identical requests which arrive while this one is running
+    async with single_flight(
+        get_flight_key("codec", content_hash),
+        lambda: get_codec(input_filepath),
+        cleanup=lambda: remove_file(input_filepath),
+    ) as codec:
+        return codec
 
 
 @router.get("/bitrate", status_code=200)
-async def bitrate(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def bitrate(file: UploadFile = File(...)):
     """
     Return the bitrate of a supplied file
     """
@@ -67,15 +233,19 @@ async def bitrate(background_tasks: BackgroundTasks, file: UploadFile = File(...
     extension = file.filename.split(".")[-1]
     input_filepath = os.path.join("/storage", f"{file_id}-input.{extension}")
     # Save the file to the storage directory
-    with open(input_filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    bitrate = await get_bitrate(input_filepath)
-    background_tasks.add_task(remove_file, input_filepath)
-    return bitrate
+    content_hash = await save_upload(file, input_filepath)
+
+    # Share the result with identical requests which arrive while this one is running
+    async with single_flight(
+        get_flight_key("bitrate", content_hash),
+        lambda: get_bitrate(input_filepath),
+        cleanup=lambda: remove_file(input_filepath),
+    ) as bitrate:
+        return bitrate
 
 
 @router.get("/media-type", status_code=200)
-async def media_type(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def media_type(file: UploadFile = File(...)):
     """
     Return the media type of a supplied file
     """
@@ -83,15 +253,19 @@ async def media_type(background_tasks: BackgroundTasks, file: UploadFile = File(
     extension = file.filename.split(".")[-1]
     input_filepath = os.path.join("/storage", f"{file_id}-input.{extension}")
     # Save the file to the storage directory
-    with open(input_filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    media_type = await get_media_type(input_filepath)
-    background_tasks.add_task(remove_file, input_filepath)
-    return media_type
+    content_hash = await save_upload(file, input_filepath)
+
+    # Share the result with identical requests which arrive while this one is running
+    async with single_flight(
+        get_flight_key("media_type", content_hash),
+        lambda: get_media_type(input_filepath),
+        cleanup=lambda: remove_file(input_filepath),
+    ) as media_type:
+        return media_type
 
 
 @router.get("/resolution", status_code=200)
-async def resolution(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def resolution(file: UploadFile = File(...)):
     """
     Return the resolution of a supplied video or multimedia file
     """
@@ -99,14 +273,16 @@ async def resolution(background_tasks: BackgroundTasks, file: UploadFile = File(
     file_id = secrets.token_hex(4)
     extension = file.filename.split(".")[-1]
     input_filepath = os.path.join("/storage", f"{file_id}-input.{extension}")
-    with open(input_filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    content_hash = await save_upload(file, input_filepath)
 
-    background_tasks.add_task(remove_file, input_filepath)
-    # Get the resolution of the file
+    # Get the resolution of the file, sharing it with identical requests
     try:
-        resolution = await get_resolution(input_filepath)
-        return resolution
+        async with single_flight(
+            get_flight_key("resolution", content_hash),
+            lambda: get_resolution(input_filepath),
+            cleanup=lambda: remove_file(input_filepath),
+        ) as resolution:
+            return resolution
     except NotAVideoError:
         raise HTTPException(
             status_code=400,
@@ -114,6 +290,85 @@ async def resolution(background_tasks: BackgroundTasks, file: UploadFile = File(
         )
 
 
+@router.post("/batch-metadata", status_code=200)
+async def batch_metadata(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(None),
+    media_ids: List[str] = Query(None),
+):
+    """
+    Return the media type, codec, bitrate, and resolution of many files as NDJSON.
+
+    The files are probed concurrently, and each line is sent as soon as its file has been
+    probed, so the lines may arrive out of order. Each line carries the index and name of
+    its file, and either its metadata or the error which prevented probing it.
+    """
+    # Ingest the uploaded files, and look up the stored ones
+    inputs = []
+    for file in files or []:
+        input_filepath = await save_input(file)
+        background_tasks.add_task(remove_file, input_filepath)
+        inputs.append((file.filename, input_filepath))
+    for media_id in media_ids or []:
+        try:
+            inputs.append((media_id, get_media_filepath(media_id)))
+        except MediaNotFoundError:
+            inputs.append((media_id, None))
+    if not inputs:
+        raise HTTPException(status_code=400, detail="At least one file is required")
+
+    async def probe(index: int, name: str, filepath: str):
+        result = {"index": index, "name": name}
+        try:
+            if filepath is None:
+                raise MediaNotFoundError(name)
+            result["metadata"] = await get_metadata(filepath)
+        except ffmpeg.Error as e:
+            result["error"] = e.stderr.decode("utf-8", errors="ignore").strip()
+        except Exception as e:
+            result["error"] = getattr(e, "message", str(e))
+        return result
+
+    async def stream_results():
+        probes = [
+            probe(index, name, filepath)
+            for index, (name, filepath) in enumerate(inputs)
+        ]
+        for finished in asyncio.as_completed(probes):
+            yield json.dumps(await finished) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@router.get("/audio-analysis", status_code=200)
+async def audio_analysis(file: UploadFile = File(...), peaks: int = 1000):
+    """
+    Return the waveform peaks and loudness statistics of a supplied audio or multimedia file
+    """
+    if peaks < 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Parameter 'peaks' must be an integer >= 1, got {peaks}",
+        )
+
+    # Save the file to the storage directory, and remove it once it is analysed
+    input_filepath = await save_input(file)
+    try:
+        # Analyse the audio of the file on this host, or hand it to a worker
+        return await dispatch_job(
+            "audio-analysis", {"input_filepath": input_filepath, "peaks": peaks}
+        )
+    except NotAnAudioError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The specified file, {file.filename}, does not contain any audio",
+        )
+    except ArgumentError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    finally:
+        await remove_files([input_filepath])
+
+
 @router.post("/transcode", status_code=200)
 async def transcode(
     background_tasks: BackgroundTasks,
@@ -130,8 +385,7 @@ async def transcode(
     file_id = secrets.token_hex(4)
     original_extension = file.filename.split(".")[-1]
     input_filepath = os.path.join("/storage", f"{file_id}-input.{original_extension}")
-    with open(input_filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    content_hash = await save_upload(file, input_filepath)
 
     # Set the output path
     if extension is None:
@@ -139,30 +393,37 @@ async def transcode(
         extension = original_extension
     output_filepath = os.path.join("/storage", f"{file_id}.{extension}")
 
-    # Set a task to remove the files once a response is sent
-    background_tasks.add_task(remove_file, input_filepath)
+    # Set a task to remove the output once a response is sent. The input is removed by
+    # coalesce_transcode() once the transcode no longer needs it.
     background_tasks.add_task(remove_file, output_filepath)
 
-    # Assemble the FFmpeg command
-    ffmpeg_command = await build_command(
-        input_filepath1=input_filepath,
-        output_filepath=output_filepath,
-        video_codec=video_codec,
-        audio_codec=audio_codec,
-        video_bitrate=video_bitrate,
-        audio_bitrate=audio_bitrate,
-        horizontal_resolution=horizontal_resolution,
-        vertical_resolution=vertical_resolution,
+    # Transcode the file on this host, or hand it to a worker. Identical requests which
+    # arrive while this one is running share its output instead of encoding it again.
+    arguments = {
+        "input_filepath1": input_filepath,
+        "output_filepath": output_filepath,
+        "video_codec": video_codec,
+        "audio_codec": audio_codec,
+        "video_bitrate": video_bitrate,
+        "audio_bitrate": audio_bitrate,
+        "horizontal_resolution": horizontal_resolution,
+        "vertical_resolution": vertical_resolution,
+    }
+    await coalesce_transcode(
+        get_flight_key(
+            "transcode",
+            content_hash,
+            extension,
+            video_codec,
+            audio_codec,
+            video_bitrate,
+            audio_bitrate,
+            horizontal_resolution,
+            vertical_resolution,
+        ),
+        arguments,
     )
 
-    # Generate the parameters for the FFmpeg container
-    params = generate_parameters(ffmpeg_command)
-
-    # Run the FFmpeg container
-    response = await run_container(params)
-    for line in response:
-        logger.info(line)
-
     # Return the transcoded file
     original_filename = file.filename.split(".")[0]
     return FileResponse(
@@ -189,8 +450,7 @@ async def merge(
     audio_filepath = os.path.join(
         "/storage", f"{audio_file_id}-input.{audio_extension}"
     )
-    with open(audio_filepath, "wb") as buffer:
-        shutil.copyfileobj(audio.file, buffer)
+    audio_hash = await save_upload(audio, audio_filepath)
 
     # Ingest the video file
     video_file_id = secrets.token_hex(4)
@@ -198,8 +458,7 @@ async def merge(
     video_filepath = os.path.join(
         "/storage", f"{video_file_id}-input.{video_extension}"
     )
-    with open(video_filepath, "wb") as buffer:
-        shutil.copyfileobj(video.file, buffer)
+    video_hash = await save_upload(video, video_filepath)
 
     # Set the output path
     output_file_id = secrets.token_hex(4)
@@ -207,35 +466,307 @@ async def merge(
         extension = video_extension
     output_filepath = os.path.join("/storage", f"{output_file_id}.{extension}")
 
-    # Set a task to remove the files once a response is sent
-    background_tasks.add_task(remove_file, audio_filepath)
-    background_tasks.add_task(remove_file, video_filepath)
+    # Set a task to remove the output once a response is sent. The inputs are removed by
+    # coalesce_transcode() once the merge no longer needs them.
     background_tasks.add_task(remove_file, output_filepath)
 
-    # Assemble the FFmpeg command
-    ffmpeg_command = await build_command(
-        input_filepath1=audio_filepath,
-        input_filepath2=video_filepath,
-        output_filepath=output_filepath,
-        video_codec=video_codec,
-        audio_codec=audio_codec,
-        video_bitrate=video_bitrate,
-        audio_bitrate=audio_bitrate,
-        horizontal_resolution=horizontal_resolution,
-        vertical_resolution=vertical_resolution,
+    # Merge the files on this host, or hand them to a worker. Identical requests which
+    # arrive while this one is running share its output instead of encoding it again.
+    arguments = {
+        "input_filepath1": audio_filepath,
+        "input_filepath2": video_filepath,
+        "output_filepath": output_filepath,
+        "video_codec": video_codec,
+        "audio_codec": audio_codec,
+        "video_bitrate": video_bitrate,
+        "audio_bitrate": audio_bitrate,
+        "horizontal_resolution": horizontal_resolution,
+        "vertical_resolution": vertical_resolution,
+    }
+    await coalesce_transcode(
+        get_flight_key(
+            "merge",
+            audio_hash,
+            video_hash,
+            extension,
+            video_codec,
+            audio_codec,
+            video_bitrate,
+            audio_bitrate,
+            horizontal_resolution,
+            vertical_resolution,
+        ),
+        arguments,
     )
 
-    # Generate the parameters for the FFmpeg container
-    params = generate_parameters(ffmpeg_command)
-
-    # Run the FFmpeg container
-    response = await run_container(params)
-    for line in response:
-        logger.info(line)
-
     # Return the multimedia file
     original_filename = video.filename.split(".")[0]
     return FileResponse(
         path=output_filepath,
         filename=f"{original_filename}.{extension}",
     )
+
+
+@router.post("/concat", status_code=200)
+async def concat(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(None),
+    media_ids: List[str] = Query(None),
+    extension: str = None,
+):
+    """
+    Join the supplied files, in order, re-encoding only those which do not match the others
+    """
+    if files and media_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="Supply either 'files' or 'media_ids', not both",
+        )
+
+    # Ingest the uploaded files, or look up the stored ones. The uploads are removed once
+    # the files are joined, or as soon as the request fails
+    upload_filepaths = []
+    try:
+        for file in files or []:
+            upload_filepaths.append(await save_input(file))
+        input_filepaths = list(upload_filepaths)
+        for media_id in media_ids or []:
+            try:
+                input_filepaths.append(get_media_filepath(media_id))
+            except MediaNotFoundError as e:
+                raise HTTPException(status_code=404, detail=e.message)
+
+        if len(input_filepaths) < 2:
+            raise HTTPException(
+                status_code=400,
+                detail="At least two files are required to concatenate",
+            )
+
+        # Set the output path
+        output_file_id = secrets.token_hex(4)
+        if extension is None:
+            extension = input_filepaths[0].split(".")[-1]
+        output_filepath = os.path.join("/storage", f"{output_file_id}.{extension}")
+        background_tasks.add_task(remove_file, output_filepath)
+
+        # Join the files on this host, or hand them to a worker
+        try:
+            await dispatch_job(
+                "concat",
+                {
+                    "input_filepaths": input_filepaths,
+                    "output_filepath": output_filepath,
+                },
+            )
+        except ArgumentError as e:
+            raise HTTPException(status_code=400, detail=e.message)
+    finally:
+        await remove_files(upload_filepaths)
+
+    return FileResponse(path=output_filepath, filename=f"concat.{extension}")
+
+
+@router.post("/clip", status_code=200)
+async def clip(
+    background_tasks: BackgroundTasks,
+    start: float,
+    end: float,
+    file: UploadFile = File(None),
+    media_id: str = None,
+    accurate: bool = False,
+    extension: str = None,
+):
+    """
+    Cut the interval between start and end, in seconds, from a supplied or stored file.
+
+    By default the streams are copied from the keyframe at or before start. If accurate
+    is set, only the partial GOPs at either end of the clip are re-encoded.
+    """
+    if start < 0:
+        raise HTTPException(status_code=400, detail=f"Start must be >= 0, got {start}")
+    if end <= start:
+        raise HTTPException(
+            status_code=400,
+            detail=f"End must be greater than start, got {start} to {end}",
+        )
+    if (file is None) == (media_id is None):
+        raise HTTPException(
+            status_code=400,
+            detail="Supply either 'file' or 'media_id'",
+        )
+
+    # Ingest the uploaded file, or look up the stored one. The upload is removed once the
+    # clip is cut, or as soon as the request fails
+    upload_filepaths = []
+    try:
+        if file is not None:
+            input_filepath = await save_input(file)
+            upload_filepaths.append(input_filepath)
+            original_filename = file.filename.split(".")[0]
+        else:
+            try:
+                input_filepath = get_media_filepath(media_id)
+            except MediaNotFoundError as e:
+                raise HTTPException(status_code=404, detail=e.message)
+            original_filename = media_id
+
+        # Set the output path
+        output_file_id = secrets.token_hex(4)
+        if extension is None:
+            extension = input_filepath.split(".")[-1]
+        output_filepath = os.path.join("/storage", f"{output_file_id}.{extension}")
+        background_tasks.add_task(remove_file, output_filepath)
+
+        # Cut the clip on this host, or hand it to a worker
+        try:
+            await dispatch_job(
+                "clip",
+                {
+                    "input_filepath": input_filepath,
+                    "output_filepath": output_filepath,
+                    "start": start,
+                    "end": end,
+                    "accurate": accurate,
+                },
+            )
+        except ArgumentError as e:
+            raise HTTPException(status_code=400, detail=e.message)
+    finally:
+        await remove_files(upload_filepaths)
+
+    return FileResponse(
+        path=output_filepath, filename=f"{original_filename}-clip.{extension}"
+    )
+
+
+@router.post("/pipeline", status_code=200)
+async def pipeline(
+    pipeline: str = Form(...),
+    files: List[UploadFile] = File(None),
+    media_ids: List[str] = Query(None),
+):
+    """
+    Run a pipeline of steps over the supplied files in a single FFmpeg run.
+
+    The pipeline is a JSON document with shared "steps" (merge, trim, scale) and a list of
+    "outputs" (media with its own codecs, bitrates, and resolution, or thumbnails). Every
+    output is stored as media, and its media id is returned.
+    """
+    try:
+        pipeline = Pipeline.model_validate_json(pipeline)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if files and media_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="Supply either 'files' or 'media_ids', not both",
+        )
+
+    # Ingest the uploaded files, or look up the stored ones. The uploads are removed once
+    # the pipeline has run, or as soon as the request fails
+    upload_filepaths = []
+    try:
+        for file in files or []:
+            upload_filepaths.append(await save_input(file))
+        input_filepaths = list(upload_filepaths)
+        for media_id in media_ids or []:
+            try:
+                input_filepaths.append(get_media_filepath(media_id))
+            except MediaNotFoundError as e:
+                raise HTTPException(status_code=404, detail=e.message)
+        if not input_filepaths:
+            raise HTTPException(status_code=400, detail="At least one file is required")
+
+        # Write every output straight into the media directory
+        os.makedirs(MEDIA_DIRECTORY, exist_ok=True)
+        outputs = []
+        for output in pipeline.outputs:
+            extension = output.extension
+            if extension is not None:
+                extension = re.sub(r"[^0-9A-Za-z]", "", extension)
+            if not extension:
+                extension = "jpg" if output.type == "thumbnail" else None
+                extension = extension or input_filepaths[0].split(".")[-1]
+            media_id = secrets.token_hex(8)
+            outputs.append(
+                {
+                    "media_id": media_id,
+                    "type": output.type,
+                    "filepath": os.path.join(
+                        MEDIA_DIRECTORY, f"{media_id}.{extension}"
+                    ),
+                }
+            )
+
+        # Run the pipeline on this host, or hand it to a worker
+        try:
+            await dispatch_job(
+                "pipeline",
+                {
+                    "input_filepaths": input_filepaths,
+                    "output_filepaths": [output["filepath"] for output in outputs],
+                    "pipeline": pipeline.model_dump(),
+                },
+            )
+        except ArgumentError as e:
+            raise HTTPException(status_code=400, detail=e.message)
+    finally:
+        await remove_files(upload_filepaths)
+
+    return {
+        "outputs": [
+            {"media_id": output["media_id"], "type": output["type"]}
+            for output in outputs
+        ]
+    }
+
+
+async def dispatch_job(kind: str, arguments: dict):
+    """
+    Run a job on this host or, on an API node, enqueue it and wait for a worker to finish it.
+
+    Returns the result of the job.
+    """
+    if get_role() == "api":
+        job_id = await enqueue_job(kind, arguments)
+        try:
+            return await wait_for_job(job_id)
+        except JobFailedError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    try:
+        return await execute_job(kind, arguments)
+    except FFmpegError as e:
+        for line in e.log:
+            logger.info(line)
+        raise HTTPException(status_code=500, detail=e.message)
+
+
+async def coalesce_transcode(key: str, arguments: dict):
+    """
+    Run a transcode once for every concurrent request with the same key.
+
+    The transcode writes to an output of its own, which is hard-linked to the output path
+    of every request sharing it, so each request can still remove its own output once its
+    response is sent. The inputs and the shared output are removed once every request has
+    its link, even if the request which started the transcode has disconnected.
+    """
+    output_base, extension = os.path.splitext(arguments["output_filepath"])
+    shared_arguments = {
+        **arguments,
+        "output_filepath": f"{output_base}-shared{extension}",
+    }
+    filepaths = [
+        shared_arguments[name]
+        for name in ["input_filepath1", "input_filepath2", "output_filepath"]
+        if name in shared_arguments
+    ]
+
+    async def transcode_once():
+        await dispatch_job("transcode", shared_arguments)
+        return shared_arguments["output_filepath"]
+
+    async with single_flight(
+        key, transcode_once, cleanup=lambda: remove_files(filepaths)
+    ) as shared_output_filepath:
+        os.link(shared_output_filepath, arguments["output_filepath"])
@@ -0,0 +1,112 @@
+"""
+single_flight.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Coalesce identical requests which arrive while the first of them is still running
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# The running work for each key
+IN_FLIGHT = {}
+
+
+def get_flight_key(*parts):
+    """
+    Build a key from the content hashes and normalized parameters of a request
+    """
+    parts = [part.lower() if isinstance(part, str) else part for part in parts]
+    return json.dumps(parts)
+
+
+@asynccontextmanager
+async def single_flight(key: str, function, cleanup=None):
+    """
+    Run function() once for every concurrent caller with the same key, and yield the result.
+
+    The first caller starts the work and later callers attach to it. The work runs in
+    its own task, so it finishes even if the caller which started it disconnects, and
+    every caller receives the same result or exception. The key is released as soon as
+    the work finishes, so later requests start afresh.
+
+    cleanup() removes whatever function() needs. If the caller starts the work, it runs
+    once the work has finished and every caller has left the block, so the files of a
+    caller which disconnected are still removed. Otherwise it runs when the caller leaves.
+
+    If the work fails with a 503, such as while the encoders are being discovered, each
+    caller which attached to it tries the work once more instead of failing with it.
+    """
+    flight = None
+    started = False
+    try:
+        for attempt in range(2):
+            flight = IN_FLIGHT.get(key)
+            started = flight is None
+            if started:
+                flight = start_flight(key, function, cleanup)
+            else:
+                logger.info("Attached to an identical request which is already running")
+            flight["callers"] += 1
+            try:
+                result = await asyncio.shield(flight["task"])
+                break
+            except HTTPException as e:
+                if started or attempt or e.status_code != 503:
+                    raise
+                leave_flight(flight)
+                flight = None
+                logger.info("Retrying an identical request which failed with a 503")
+        yield result
+    finally:
+        if flight:
+            leave_flight(flight)
+        if cleanup and not started:
+            await cleanup()
+
+
+def start_flight(key: str, function, cleanup):
+    """
+    Start the work for a key in its own task
+    """
+    flight = {
+        "task": asyncio.ensure_future(function()),
+        "callers": 0,
+        "cleanup": cleanup,
+    }
+    IN_FLIGHT[key] = flight
+
+    def finish_flight(task):
+        if IN_FLIGHT.get(key) is flight:
+            IN_FLIGHT.pop(key)
+        # Mark the exception as retrieved in case every caller has already left
+        if not task.cancelled():
+            task.exception()
+        release_flight(flight)
+
+    flight["task"].add_done_callback(finish_flight)
+    return flight
+
+
+def leave_flight(flight: dict):
+    flight["callers"] -= 1
+    release_flight(flight)
+
+
+def release_flight(flight: dict):
+    """
+    Run the cleanup of finished work once every caller has left it
+    """
+    if flight["task"].done() and flight["callers"] == 0 and flight["cleanup"]:
+        cleanup, flight["cleanup"] = flight["cleanup"], None
+        asyncio.ensure_future(cleanup())
@@ -11,7 +11,32 @@ the MIT License. See the LICENSE file for more details.
 """
 
 import os
+import logging
+import ffmpeg
+from ffmpeg_methods.get_keyframe_index import get_keyframe_index
+
+logger = logging.getLogger(__name__)
 
 
 async def remove_file(filepath: str):
     os.remove(filepath)
+
+
+async def remove_files(filepaths: list):
+    # Skip files which were never created, such as the output of a failed job
+    for filepath in filepaths:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+
+async def build_keyframe_index(filepath: str):
+    # Nothing waits on the index, so report a file which ffprobe cannot read in the log
+    try:
+        await get_keyframe_index(filepath)
+    except ffmpeg.Error as e:
+        logger.warning(
+            f"Could not index the keyframes of {filepath}: "
+            f"{e.stderr.decode('utf-8', errors='ignore').strip()}"
+        )
+    except Exception:
+        logger.exception(f"Could not index the keyframes of {filepath}")
@@ -0,0 +1,28 @@
+"""
+get_media_filepath.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Get the filepath of a stored media file from its media id
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import re
+import glob
+from config import MEDIA_DIRECTORY
+from exceptions import MediaNotFoundError
+
+
+def get_media_filepath(media_id: str):
+    # Media ids are generated by store_media() and never contain path characters
+    if not re.fullmatch(r"[0-9a-f]{16}", media_id):
+        raise MediaNotFoundError(media_id)
+
+    matches = glob.glob(os.path.join(MEDIA_DIRECTORY, f"{media_id}.*"))
+    if not matches:
+        raise MediaNotFoundError(media_id)
+    return matches[0]
@@ -0,0 +1,29 @@
+"""
+save_input.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Save a supplied file to the storage directory as the input of a request
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import re
+import secrets
+from fastapi import UploadFile
+from storage_methods.save_upload import save_upload
+
+
+async def save_input(file: UploadFile):
+    """
+    Save a supplied file to the storage directory and return its path
+    """
+    # Keep the extension so that FFmpeg can still infer the container format
+    file_id = secrets.token_hex(4)
+    extension = re.sub(r"[^0-9A-Za-z]", "", file.filename.split(".")[-1])
+    input_filepath = os.path.join("/storage", f"{file_id}-input.{extension}")
+    await save_upload(file, input_filepath)
+    return input_filepath
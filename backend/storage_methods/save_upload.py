@@ -0,0 +1,29 @@
+"""
+save_upload.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Save an uploaded file to storage while hashing its content
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import hashlib
+from fastapi import UploadFile
+
+# Number of bytes copied and hashed at once
+CHUNK_SIZE = 1024 * 1024
+
+
+async def save_upload(file: UploadFile, filepath: str):
+    """
+    Save a supplied file to filepath and return the SHA-256 hash of its content
+    """
+    content_hash = hashlib.sha256()
+    with open(filepath, "wb") as buffer:
+        while chunk := file.file.read(CHUNK_SIZE):
+            content_hash.update(chunk)
+            buffer.write(chunk)
+    return content_hash.hexdigest()
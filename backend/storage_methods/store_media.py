@@ -0,0 +1,34 @@
+"""
+store_media.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Store an uploaded file so that it can be referenced by its media id in later requests
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import re
+import shutil
+import secrets
+from fastapi import UploadFile
+from config import MEDIA_DIRECTORY
+
+
+async def store_media(file: UploadFile):
+    """
+    Save a supplied file to the media directory and return its media id
+    """
+    os.makedirs(MEDIA_DIRECTORY, exist_ok=True)
+
+    # Keep the extension so that FFmpeg can still infer the container format
+    media_id = secrets.token_hex(8)
+    extension = re.sub(r"[^0-9A-Za-z]", "", file.filename.split(".")[-1])
+    media_filepath = os.path.join(MEDIA_DIRECTORY, f"{media_id}.{extension}")
+    with open(media_filepath, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+    return media_id
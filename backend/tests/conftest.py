@@ -0,0 +1,24 @@
+"""
+conftest.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Shared fixtures for the test suite
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import pytest
+import queue_methods.get_connection
+
+
+@pytest.fixture
+def queue_path(tmp_path, monkeypatch):
+    """
+    Point the job queue at an empty database for the duration of a test
+    """
+    path = str(tmp_path / "queue.sqlite3")
+    monkeypatch.setattr(queue_methods.get_connection, "QUEUE_PATH", path)
+    return path
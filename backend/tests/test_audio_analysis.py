@@ -0,0 +1,74 @@
+"""
+test_audio_analysis.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Tests for the waveform peaks and loudness statistics of the audio analysis
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import math
+import shutil
+import subprocess
+import pytest
+from ffmpeg_methods.get_audio_analysis import get_audio_analysis
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="FFmpeg is not installed"
+)
+
+DURATION = 5
+
+
+def make_sine(filepath, amplitudes: list):
+    """
+    Write a 1kHz sine with the given amplitude in each channel, and return the ffprobe
+    output which describes it
+    """
+    expression = "|".join(f"{amplitude}*sin(2*PI*1000*t)" for amplitude in amplitudes)
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-nostdin",
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"aevalsrc={expression}:s=48000:d={DURATION}",
+            "-c:a",
+            "pcm_f32le",
+            str(filepath),
+        ],
+        check=True,
+    )
+    return {
+        "streams": [{"codec_type": "audio", "channels": len(amplitudes)}],
+        "format": {"duration": str(DURATION)},
+    }
+
+
+def sine_loudness(amplitudes: list):
+    # A full-scale 1kHz sine in one channel measures -3.01 LUFS
+    return -3.01 + 10 * math.log10(sum(amplitude**2 for amplitude in amplitudes))
+
+
+@pytest.mark.parametrize("amplitudes", [[0.5], [0.5, 0.25]])
+async def test_peak_and_loudness_of_a_sine(tmp_path, amplitudes):
+    filepath = tmp_path / "sine.wav"
+    info = make_sine(filepath, amplitudes)
+
+    analysis = await get_audio_analysis(str(filepath), peaks=100, info=info)
+
+    # The waveform is the mean of the channels, and the loudness sums their power
+    downmix = sum(amplitudes) / len(amplitudes)
+    assert analysis["duration"] == pytest.approx(DURATION, abs=0.01)
+    assert len(analysis["peaks"]["max"]) == 100
+    assert analysis["peak"] == pytest.approx(downmix, rel=0.01)
+    assert analysis["rms"] == pytest.approx(downmix / math.sqrt(2), rel=0.01)
+    assert analysis["integrated_loudness"] == pytest.approx(
+        sine_loudness(amplitudes), abs=0.1
+    )
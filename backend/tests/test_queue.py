@@ -0,0 +1,175 @@
+"""
+test_queue.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Tests for the SQLite job queue
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import time
+import asyncio
+import pytest
+from contextlib import closing
+from config import MAX_ATTEMPTS
+from exceptions import JobFailedError
+import queue_methods.wait_for_job
+from queue_methods.get_connection import get_connection
+from queue_methods.enqueue_job import enqueue_job
+from queue_methods.lease_job import lease_job
+from queue_methods.renew_lease import renew_lease
+from queue_methods.finish_job import complete_job, fail_job
+from queue_methods.wait_for_job import wait_for_job
+
+
+def get_job(job_id):
+    with closing(get_connection()) as connection:
+        return dict(
+            connection.execute(
+                "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        )
+
+
+def expire_lease(job_id):
+    with closing(get_connection()) as connection:
+        connection.execute(
+            "UPDATE jobs SET lease_expires_at = ? WHERE job_id = ?",
+            (time.time() - 1, job_id),
+        )
+
+
+async def test_lease_job_leases_each_job_once(queue_path):
+    job_id = await enqueue_job("transcode", {"output_filepath": "/storage/out.mp4"})
+
+    job = await lease_job("worker-1")
+    assert job["job_id"] == job_id
+    assert job["status"] == "running"
+    assert job["worker_id"] == "worker-1"
+    assert job["attempts"] == 1
+    assert job["arguments"] == {"output_filepath": "/storage/out.mp4"}
+    assert job == {**get_job(job_id), "arguments": job["arguments"]}
+
+    assert await lease_job("worker-2") is None
+
+
+async def test_lease_job_leases_oldest_job_first(queue_path):
+    first_job_id = await enqueue_job("transcode", {})
+    second_job_id = await enqueue_job("pipeline", {})
+
+    assert (await lease_job("worker-1"))["job_id"] == first_job_id
+    assert (await lease_job("worker-1"))["job_id"] == second_job_id
+
+
+async def test_expired_lease_passes_to_another_worker(queue_path):
+    job_id = await enqueue_job("transcode", {})
+    await lease_job("worker-1")
+    expire_lease(job_id)
+
+    job = await lease_job("worker-2")
+    assert job["job_id"] == job_id
+    assert job["worker_id"] == "worker-2"
+    assert job["attempts"] == 2
+
+
+async def test_renew_lease_requires_the_current_worker(queue_path):
+    job_id = await enqueue_job("transcode", {})
+    await lease_job("worker-1")
+    expire_lease(job_id)
+    await lease_job("worker-2")
+
+    assert not await renew_lease(job_id, "worker-1")
+    assert await renew_lease(job_id, "worker-2")
+
+
+async def test_job_fails_after_max_attempts(queue_path):
+    job_id = await enqueue_job("transcode", {})
+    for attempt in range(MAX_ATTEMPTS):
+        job = await lease_job(f"worker-{attempt}")
+        assert job["attempts"] == attempt + 1
+        expire_lease(job_id)
+
+    assert await lease_job("worker-last") is None
+    job = get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error_status"] == 500
+
+
+async def test_finish_job_ignores_a_worker_which_lost_the_lease(queue_path):
+    job_id = await enqueue_job("audio-analysis", {})
+    await lease_job("worker-1")
+    expire_lease(job_id)
+    await lease_job("worker-2")
+
+    await fail_job(job_id, "worker-1", 500, "Lost the lease")
+    await complete_job(job_id, "worker-1", {"peak": 1.0})
+    assert get_job(job_id)["status"] == "running"
+
+    await complete_job(job_id, "worker-2", {"peak": 0.5})
+    assert await wait_for_job(job_id) == {"peak": 0.5}
+
+    # A finished job cannot be finished again
+    await fail_job(job_id, "worker-2", 500, "Too late")
+    assert get_job(job_id)["status"] == "succeeded"
+
+
+async def test_wait_for_job_raises_the_failure(queue_path):
+    job_id = await enqueue_job("transcode", {})
+    await lease_job("worker-1")
+    await fail_job(job_id, "worker-1", 400, "Invalid arguments")
+
+    with pytest.raises(JobFailedError) as error:
+        await wait_for_job(job_id)
+    assert (error.value.status_code, error.value.detail) == (400, "Invalid arguments")
+
+
+async def test_wait_for_job_fails_a_job_which_is_never_leased(queue_path, monkeypatch):
+    monkeypatch.setattr(queue_methods.wait_for_job, "QUEUE_TIMEOUT_SECONDS", 0)
+    job_id = await enqueue_job("transcode", {})
+
+    with pytest.raises(JobFailedError) as error:
+        await wait_for_job(job_id)
+    assert error.value.status_code == 503
+
+    # No worker may run the job after its request has given up on it
+    assert get_job(job_id)["status"] == "failed"
+    assert await lease_job("worker-1") is None
+
+
+async def test_wait_for_job_fails_a_job_which_runs_too_long(queue_path, monkeypatch):
+    monkeypatch.setattr(queue_methods.wait_for_job, "JOB_TIMEOUT_SECONDS", 0)
+    job_id = await enqueue_job("transcode", {})
+    await lease_job("worker-1")
+
+    with pytest.raises(JobFailedError) as error:
+        await wait_for_job(job_id)
+    assert error.value.status_code == 504
+
+    # The worker's result arrives too late to be recorded
+    await complete_job(job_id, "worker-1")
+    assert get_job(job_id)["status"] == "failed"
+
+
+async def test_wait_for_job_reports_a_missing_job(queue_path):
+    with pytest.raises(JobFailedError) as error:
+        await wait_for_job("0123456789abcdef")
+    assert error.value.status_code == 500
+
+
+async def test_queue_calls_do_not_block_the_event_loop(queue_path):
+    # Hold the write lock, as a worker leasing a job does
+    blocker = get_connection()
+    blocker.execute("BEGIN IMMEDIATE")
+    enqueue = asyncio.create_task(enqueue_job("transcode", {}))
+
+    # The event loop keeps running while the enqueue waits for the lock
+    await asyncio.sleep(0.1)
+    assert not enqueue.done()
+
+    blocker.execute("COMMIT")
+    blocker.close()
+    job_id = await enqueue
+    assert get_job(job_id)["status"] == "queued"
@@ -0,0 +1,177 @@
+"""
+test_single_flight.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Tests for the coalescing of identical in-flight requests
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import time
+import asyncio
+import ffmpeg
+import pytest
+from fastapi import HTTPException
+from ffmpeg_methods.get_codec import get_codec
+from routers.single_flight import IN_FLIGHT, get_flight_key, single_flight
+
+
+async def call(key, function, cleanup=None):
+    async with single_flight(key, function, cleanup=cleanup) as result:
+        return result
+
+
+def make_work(results, calls, release):
+    async def work():
+        calls.append(len(calls))
+        await release.wait()
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return work
+
+
+def make_cleanup(cleanups, name):
+    async def cleanup():
+        cleanups.append(name)
+
+    return cleanup
+
+
+def test_get_flight_key_normalizes_strings():
+    assert get_flight_key("transcode", "ABC", None, 1) == get_flight_key(
+        "transcode", "abc", None, 1
+    )
+    assert get_flight_key("codec", "abc") != get_flight_key("bitrate", "abc")
+
+
+async def test_concurrent_callers_share_one_run():
+    calls, release = [], asyncio.Event()
+    work = make_work(["result"], calls, release)
+    callers = [asyncio.create_task(call("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*callers) == ["result"] * 3
+    assert len(calls) == 1
+    assert "key" not in IN_FLIGHT
+
+
+async def test_callers_share_the_exception():
+    calls, release = [], asyncio.Event()
+    work = make_work([HTTPException(status_code=400)], calls, release)
+    callers = [asyncio.create_task(call("key", work)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+
+    for result in await asyncio.gather(*callers, return_exceptions=True):
+        assert isinstance(result, HTTPException) and result.status_code == 400
+    assert len(calls) == 1
+
+
+async def test_key_is_released_once_the_work_finishes():
+    calls, release = [], asyncio.Event()
+    release.set()
+    work = make_work(["first", "second"], calls, release)
+
+    assert await call("key", work) == "first"
+    assert await call("key", work) == "second"
+    assert len(calls) == 2
+
+
+async def test_cleanup_waits_for_every_caller_to_leave():
+    calls, cleanups, release = [], [], asyncio.Event()
+    work = make_work(["result"], calls, release)
+    leaving = asyncio.Event()
+
+    async def use(name):
+        async with single_flight(
+            "key", work, cleanup=make_cleanup(cleanups, name)
+        ) as result:
+            await leaving.wait()
+            return result
+
+    callers = [asyncio.create_task(use(name)) for name in ["leader", "follower"]]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.sleep(0.01)
+
+    # The follower's cleanup runs as it leaves, but the leader's waits for the follower
+    assert cleanups == []
+    leaving.set()
+    await asyncio.gather(*callers)
+    await asyncio.sleep(0)
+    assert sorted(cleanups) == ["follower", "leader"]
+
+
+async def test_cleanup_runs_when_the_leader_disconnects():
+    calls, cleanups, release = [], [], asyncio.Event()
+    work = make_work(["result"], calls, release)
+    leader = asyncio.create_task(call("key", work, make_cleanup(cleanups, "leader")))
+    await asyncio.sleep(0)
+
+    # The work carries on after the leader is cancelled, and is cleaned up once it ends
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert cleanups == []
+    release.set()
+    await asyncio.sleep(0.01)
+    assert cleanups == ["leader"]
+
+
+async def test_follower_retries_after_a_503():
+    calls, cleanups, release = [], [], asyncio.Event()
+    work = make_work([HTTPException(status_code=503), "result"], calls, release)
+    leader = asyncio.create_task(call("key", work, make_cleanup(cleanups, "leader")))
+    followers = [
+        asyncio.create_task(call("key", work, make_cleanup(cleanups, name)))
+        for name in ["follower-1", "follower-2"]
+    ]
+    await asyncio.sleep(0)
+    release.set()
+
+    with pytest.raises(HTTPException):
+        await leader
+    assert await asyncio.gather(*followers) == ["result", "result"]
+    await asyncio.sleep(0)
+
+    # The followers run the work once between them, and every caller is cleaned up
+    assert len(calls) == 2
+    assert sorted(cleanups) == ["follower-1", "follower-2", "leader"]
+
+
+async def test_follower_retries_only_once():
+    calls, release = [], asyncio.Event()
+    work = make_work([HTTPException(status_code=503)] * 2, calls, release)
+    callers = [asyncio.create_task(call("key", work)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+
+    for result in await asyncio.gather(*callers, return_exceptions=True):
+        assert isinstance(result, HTTPException) and result.status_code == 503
+    assert len(calls) == 2
+
+
+async def test_duplicate_probe_attaches_to_the_running_probe(monkeypatch):
+    probes = []
+
+    def slow_probe(filepath):
+        probes.append(filepath)
+        time.sleep(0.2)
+        return {"streams": [{"codec_type": "video", "codec_name": "h264"}]}
+
+    monkeypatch.setattr(ffmpeg, "probe", slow_probe)
+    key = get_flight_key("codec", "abc")
+    first = asyncio.create_task(call(key, lambda: get_codec("/storage/first.mp4")))
+    await asyncio.sleep(0.05)
+
+    # The probe runs off the event loop, so the duplicate arrives while it is in flight
+    second = asyncio.create_task(call(key, lambda: get_codec("/storage/second.mp4")))
+    assert await asyncio.gather(first, second) == [{"video": "h264"}] * 2
+    assert probes == ["/storage/first.mp4"]
@@ -0,0 +1,98 @@
+"""
+worker.py
+
+@Author: Ethan Brown - ethan@ewbrowntech.com
+
+Run an encode worker which pulls jobs from the shared queue
+
+Copyright (C) 2024 by Ethan Brown
+All rights reserved. This file is part of the FFmpeg-API project and is released under
+the MIT License. See the LICENSE file for more details.
+"""
+
+import os
+import socket
+import asyncio
+import logging
+import secrets
+from fastapi import HTTPException
+from exceptions import ArgumentError, FFmpegError, NotAnAudioError
+from config import AVAILBLE_ENCODERS, HEARTBEAT_SECONDS, POLL_SECONDS
+from docker_methods.execute_job import execute_job
+from ffmpeg_methods.discover_encoders import discover_encoders
+from queue_methods.lease_job import lease_job
+from queue_methods.renew_lease import renew_lease
+from queue_methods.finish_job import complete_job, fail_job
+from queue_methods.report_heartbeat import report_heartbeat
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def send_heartbeats(worker_id: str, job_id: str = None):
+    """
+    Report that the worker is alive and renew its lease on the current job until cancelled
+    """
+    while True:
+        await report_heartbeat(worker_id, AVAILBLE_ENCODERS)
+        if job_id and not await renew_lease(job_id, worker_id):
+            logger.warning(f"Lost the lease on job {job_id}")
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+
+
+async def run_job(worker_id: str, job: dict):
+    """
+    Run a leased job and record its outcome in the queue
+    """
+    job_id = job["job_id"]
+    arguments = job["arguments"]
+    logger.info(f"Running {job['kind']} job {job_id} (attempt {job['attempts']})")
+
+    # A previous attempt may have left partial outputs behind
+    if job["attempts"] > 1:
+        output_filepaths = arguments.get("output_filepaths", [])
+        if "output_filepath" in arguments:
+            output_filepaths = [arguments["output_filepath"]]
+        for output_filepath in output_filepaths:
+            if os.path.exists(output_filepath):
+                os.remove(output_filepath)
+
+    heartbeats = asyncio.create_task(send_heartbeats(worker_id, job_id))
+    try:
+        result = await execute_job(job["kind"], arguments)
+        await complete_job(job_id, worker_id, result)
+    except HTTPException as e:
+        await fail_job(job_id, worker_id, e.status_code, e.detail)
+    except (ArgumentError, NotAnAudioError) as e:
+        await fail_job(job_id, worker_id, 400, e.message)
+    except FFmpegError as e:
+        for line in e.log:
+            logger.info(line)
+        await fail_job(job_id, worker_id, 500, e.message)
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        await fail_job(job_id, worker_id, 500, str(e))
+    finally:
+        heartbeats.cancel()
+
+
+async def main():
+    worker_id = f"{socket.gethostname()}-{secrets.token_hex(4)}"
+
+    await discover_encoders()
+
+    logger.info(f"Worker {worker_id} is waiting for jobs")
+    heartbeats = asyncio.create_task(send_heartbeats(worker_id))
+    while True:
+        job = await lease_job(worker_id)
+        if job is None:
+            await asyncio.sleep(POLL_SECONDS)
+            continue
+        await run_job(worker_id, job)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())